@@ -1,371 +1,569 @@
-from __future__ import annotations
-from typing import TYPE_CHECKING
-
-import abc
-import types
-
-from collections import OrderedDict
-from dataclasses import dataclass, field
-from typing import List, Tuple
-
-import cv2
-import numpy as np
-from scipy.spatial import distance as dist
-
-from camtrappy.core.base import Object
-from camtrappy.db.schema import Object as DbObject, VideoObject
-
-
-if TYPE_CHECKING:
-    from camtrappy.core.base import Frame, VideoLoader
-    from sqlalchemy.orm import sessionmaker
-
-
-def bboxes_from_polygons(polygons: List[np.ndarray]) -> List[np.ndarray]:
-    """Return Bounding Boxes of a list of Polygons."""
-    return [cv2.boundingRect(poly) for poly in polygons]
-
-def bbox_intersects(a, b):
-    """Test for intersection of two bboxes."""
-    x = max(a[0], b[0])
-    y = max(a[1], b[1])
-    w = min(a[0] + a[2], b[0] + b[2]) - x
-    h = min(a[1] + a[3], b[1] + b[3]) - y
-    if w < 0 or h < 0:
-        return False
-    return True
-
-def centroids_from_bboxes(bboxes: List[np.ndarray]) -> List[Tuple]:
-    """Calculate centroids for a list of bboxes."""
-    # initialize an array of input centroids for the current frame
-    inputCentroids = np.zeros((len(bboxes), 2), dtype="int")
-
-    # loop over the bounding box rectangles
-    for (i, (startX, startY, width, height)) in enumerate(bboxes):
-        # use the bounding box coordinates to derive the centroid
-        cX = int((2*startX + width) / 2.0)
-        cY = int((2*startY + height) / 2.0)
-        inputCentroids[i] = (cX, cY)
-
-    return inputCentroids
-
-def detect_contours(frame: Frame, min_area: int = None) -> List[np.ndarray]:
-    """Detect Contours of elements in an image.
-
-    Return a list of contours where every contour
-    is a numpy array of (x, y) coordinates.
-    """
-    contours, _ = cv2.findContours(frame.last,
-                                    cv2.RETR_TREE,
-                                    cv2.CHAIN_APPROX_SIMPLE)
-    if min_area is not None:
-        contours = [c for c in contours if cv2.contourArea(c) > min_area]
-    return contours
-
-def draw_bboxes(frame: Frame, bboxes: List[np.ndarray]):
-    """Draw bboxes on a frame."""
-    for bbox in bboxes:
-        x, y, w, h = bbox
-        cv2.rectangle(frame.original, (x, y), (x + w, y + h), 255, 2)
-
-def draw_object_ids(frame: Frame, objects: OrderedDict[Object]):
-        for objectID, object in objects.items():
-            text = f'ID {objectID}'
-            img = frame.original
-            x, y = object.last_centroid
-            cv2.putText(img, text, (x - 20, y - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.6, 255, 0)
-            cv2.circle(img, (x, y), cv2.FONT_HERSHEY_SIMPLEX, 255, 2)
-
-def merge_bboxes(bboxes, eps: float = 1.5):
-    """Merge all overlapping bboxes.
-
-    groupRectangles: The function is a wrapper for the
-    generic function partition . It clusters all the input rectangles
-    using the rectangle equivalence criteria that combines rectangles
-    with similar sizes and similar locations.
-    The similarity is defined by eps.
-    When eps=0 , no clustering is done at all. If eps→+inf,
-    all the rectangles are put in one cluster.
-    Then, the small clusters containing less than or
-    equal to groupThreshold rectangles are rejected.
-    In each other cluster, the average rectangle is computed and
-    put into the output rectangle list.
-
-    Parameters
-    ----------
-    bboxes
-    eps : float
-        Defines how far away rectangles can be from each other
-        to be considered for grouping.
-    """
-    tmp = []
-    for bbox in bboxes:
-        x, y, w, h = bbox
-        # cv2.groupRectangles returns a result for each successful grouping
-        # duplicate every bbox to retain non-overlapping bboxes
-        tmp.append([x, y, w, h])
-        tmp.append([x, y, w, h])
-    merged, weights = cv2.groupRectangles(tmp, groupThreshold=1, eps=eps)
-    merged = np.asarray(merged).tolist()
-    return merged
-
-
-class IVisitor(metaclass=abc.ABCMeta):
-
-    def __init__(self, apply_args: List[str] = None):
-        super().__init__()
-        self.apply_args = apply_args
-
-        for arg in self.apply_args:
-            if not hasattr(self, arg):
-                raise AttributeError('One ore more of the specified `apply_args` '
-                                     'is not an attribute.')
-            if not type(getattr(self, arg)) == types.MethodType:
-                raise TypeError('One or more of the specified `apply_args` '
-                                'is not a method.')
-
-    @abc.abstractmethod
-    def apply(self):
-        pass
-
-
-class CentroidTracker(IVisitor):
-    """Copied (and adjusted) from pyimagesearch.
-
-    https://www.pyimagesearch.com/2018/07/23/simple-object-tracking-with-opencv/
-    """
-    def __init__(self,
-                 min_area: int = None,
-                 eps: float = 1.5,
-                 maxDisappeared: int= 50,
-                 Session: sessionmaker = None,
-                 apply_args: List[str] = list()):
-
-        super().__init__(apply_args)
-
-        # initialize the next unique object ID along with two ordered
-        # dictionaries used to keep track of mapping a given object
-        # ID to its centroid and number of consecutive frames it has
-        # been marked as "disappeared", respectively
-        self.min_area = min_area
-        self.eps = eps
-        self.next_object_id: int = 0
-        self.finished_objects: OrderedDict[int, Object] = OrderedDict()
-        self.current_objects: OrderedDict[int, Object] = OrderedDict()
-        self.disappeared_objects: OrderedDict[int, Object] = OrderedDict()
-
-        # store the number of maximum consecutive frames a given
-        # object is allowed to be marked as "disappeared" until we
-        # need to deregister the object from tracking
-        self.maxDisappeared = maxDisappeared
-
-        self.Session = Session
-
-    def apply(self, frame: Frame):
-        contours = detect_contours(frame, self.min_area)
-        bboxes = bboxes_from_polygons(contours)
-        bboxes = merge_bboxes(bboxes, eps=self.eps)
-        objects = self.update(frame.video_id, frame.frame_no, bboxes)
-
-        draw_bboxes(frame, bboxes)
-        draw_object_ids(frame, objects)
-
-        if self.Session:
-            with self.Session.begin() as session:
-                new_objects = []
-                while len(self.finished_objects) > 0:
-                    object = self.finished_objects.popitem()[1]
-                    db_object = DbObject()
-                    for video_id in object.video_ids:
-                        vo = VideoObject(video_id=video_id,
-                                         object=db_object,
-                                         frames=object.frames(video_id),
-                                         bboxes=object.bboxes(video_id),
-                                         centroids=object.bboxes(video_id))
-                        new_objects.append(vo)
-                session.add_all(new_objects)
-
-    def register(self, video_id, frame_no, bbox, centroid):
-        id = self.next_object_id
-        self.current_objects.\
-            setdefault(id, Object(id)).\
-            add(video_id, frame_no, bbox, centroid)
-
-        self.disappeared_objects[id] = 0
-        self.next_object_id += 1
-
-    def deregister(self, object_id):
-        self.finished_objects[object_id] = self.current_objects[object_id]
-
-        del self.current_objects[object_id]
-        del self.disappeared_objects[object_id]
-
-    def update(self, video_id, frame_no, bboxes):
-        if len(bboxes) == 0:
-            # loop over any existing tracked objects and mark them
-            # as disappeared
-            keys = list(self.disappeared_objects.keys())
-            for object_id in keys:
-                self.disappeared_objects[object_id] += 1
-
-                # if we have reached a maximum number of consecutive
-                # frames where a given object has been marked as
-                # missing, deregister it
-                if self.disappeared_objects[object_id] > self.maxDisappeared:
-                    self.deregister(object_id)
-
-            # return early as there are no centroids or tracking info
-            # to update
-            return self.current_objects
-
-        inputCentroids = centroids_from_bboxes(bboxes)
-
-        # if we are currently not tracking any objects take the input
-        # centroids and register each of them
-        if len(self.current_objects) == 0:
-            for i in range(0, len(inputCentroids)):
-                self.register(video_id, frame_no, bboxes[i], inputCentroids[i])
-
-        # otherwise, are are currently tracking objects so we need to
-        # try to match the input centroids to existing object
-        # centroids
-        else:
-            # grab the set of object IDs and corresponding centroids
-            ids = self.current_objects.keys()
-            objects = self.current_objects.values()
-            objectIDs = list(ids)
-            objectCentroids = [o.last_centroid for o in list(objects)]
-
-            # compute the distance between each pair of object
-            # centroids and input centroids, respectively -- our
-            # goal will be to match an input centroid to an existing
-            # object centroid
-            D = dist.cdist(np.array(objectCentroids), inputCentroids)
-
-            # in order to perform this matching we must (1) find the
-            # smallest value in each row and then (2) sort the row
-            # indexes based on their minimum values so that the row
-            # with the smallest value as at the *front* of the index
-            # list
-            rows = D.min(axis=1).argsort()
-
-            # next, we perform a similar process on the columns by
-            # finding the smallest value in each column and then
-            # sorting using the previously computed row index list
-            cols = D.argmin(axis=1)[rows]
-
-            # in order to determine if we need to update, register,
-            # or deregister an object we need to keep track of which
-            # of the rows and column indexes we have already examined
-            usedRows = set()
-            usedCols = set()
-
-            # loop over the combination of the (row, column) index
-            # tuples
-            for (row, col) in zip(rows, cols):
-                # if we have already examined either the row or
-                # column value before, ignore it
-                # val
-                if row in usedRows or col in usedCols:
-                    continue
-
-                # otherwise, grab the object ID for the current row,
-                # set its new centroid, and reset the disappeared
-                # counter
-                objectID = objectIDs[row]
-                self.current_objects[objectID].add(video_id, frame_no, bboxes[col], inputCentroids[col])
-                self.disappeared_objects[objectID] = 0
-
-                # indicate that we have examined each of the row and
-                # column indexes, respectively
-                usedRows.add(row)
-                usedCols.add(col)
-
-            # compute both the row and column index we have NOT yet
-            # examined
-            unusedRows = set(range(0, D.shape[0])).difference(usedRows)
-            unusedCols = set(range(0, D.shape[1])).difference(usedCols)
-
-            # in the event that the number of object centroids is
-            # equal or greater than the number of input centroids
-            # we need to check and see if some of these objects have
-            # potentially disappeared
-            if D.shape[0] >= D.shape[1]:
-                # loop over the unused row indexes
-                for row in unusedRows:
-                    # grab the object ID for the corresponding row
-                    # index and increment the disappeared counter
-                    objectID = objectIDs[row]
-                    self.disappeared_objects[objectID] += 1
-
-                    # check to see if the number of consecutive
-                    # frames the object has been marked "disappeared"
-                    # for warrants deregistering the object
-                    if self.disappeared_objects[objectID] > self.maxDisappeared:
-                        self.deregister(objectID)
-
-            # otherwise, if the number of input centroids is greater
-            # than the number of existing object centroids we need to
-            # register each new input centroid as a trackable object
-            else:
-                for col in unusedCols:
-                    self.register(video_id, frame_no, bboxes[col], inputCentroids[col])
-
-        # return the set of trackable objects
-        return self.current_objects
-
-
-@dataclass
-class VideoAnalysis:
-
-    exclude_area: List[int] = None
-    road_area: List[int] = None
-    setting_noise_reduction: int = None
-    stream: VideoLoader = field(init=False)
-
-
-# What should the data structure look like?
-"""
-# TODO: define a better structure for video list
-# Goal2: it should be possible to define max-time-gap between two videos
-#   to decide whether to treat them separately
-
-videos = {
-    id: {
-        'path':,
-        'datetime':, # timediff is easier to calculate
-        'fps':,
-        'duration':,
-    }
-}
-
-active_objects = {
-    id: {
-        'video_ids': [],
-        'video_paths': [],
-        'coordinates':,
-        'bboxes':,
-        'images':,
-        'starttime':,
-        'endtime':,
-        'starttime_in_video':,
-        'endtime_in_video':
-    }
-}
-
-collected_objects = [
-    {
-        'id':,
-        'video_ids':,
-        'video_paths':,
-        'coordinates':,
-        'bboxes':,
-        'images':,
-        'starttime':,
-        'endtime':,
-        'starttime_in_video':,
-        'endtime_in_video':
-    },
-     ]},
-]
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+import abc
+import inspect
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+from scipy.optimize import linear_sum_assignment
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+from camtrappy.core.base import Object
+from camtrappy.db.schema import Object as DbObject, VideoObject
+
+
+if TYPE_CHECKING:
+    from camtrappy.core.base import Frame, VideoLoader
+    from sqlalchemy.orm import sessionmaker
+
+
+def bboxes_from_polygons(polygons: List[np.ndarray]) -> np.ndarray:
+    """Return Bounding Boxes of a list of Polygons.
+
+    Return the bboxes of shape (N, 4) as (x, y, w, h).
+    """
+    boundingRect = cv2.boundingRect
+    bboxes = [boundingRect(poly) for poly in polygons]
+    return np.array(bboxes, dtype=np.int32).reshape(-1, 4)
+
+def bbox_intersects(a, b):
+    """Test for intersection of two bboxes."""
+    x = max(a[0], b[0])
+    y = max(a[1], b[1])
+    w = min(a[0] + a[2], b[0] + b[2]) - x
+    h = min(a[1] + a[3], b[1] + b[3]) - y
+    if w < 0 or h < 0:
+        return False
+    return True
+
+def centroids_from_bboxes(bboxes: List[np.ndarray]) -> np.ndarray:
+    """Calculate centroids for a list of bboxes.
+
+    Pixel coordinates fit into int16, which halves the
+    memory of the centroids compared to int32.
+    """
+    bboxes = np.asarray(bboxes, dtype=np.int32).reshape(-1, 4)
+    # centroid = (2*x + w) / 2 = x + w / 2, widths are never negative
+    return (bboxes[:, :2] + (bboxes[:, 2:] >> 1)).astype(np.int16)
+
+def squared_distances(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Return the squared euclidean distances between two sets of 2-D points.
+
+    Return a matrix of shape (N, M) for N points in `a` and M points
+    in `b`. The square root is skipped, matching on squared distances
+    penalizes single large jumps more than several small ones.
+    """
+    # int16 centroids are only upcast here. float32 squared distances
+    # are exact up to 2**24, i.e. for points less than 2896 px apart in
+    # x and y. Within frames of up to 4096 px they stay below 2**25
+    # and are off by at most 1, too little to change the matching
+    a = np.asarray(a).astype(np.float32, copy=False)
+    b = np.asarray(b).astype(np.float32, copy=False)
+    # x and y are handled separately instead of summing
+    # over a third axis of length 2
+    dx = a[:, 0, None] - b[None, :, 0]
+    dy = a[:, 1, None] - b[None, :, 1]
+    dx *= dx
+    dy *= dy
+    dx += dy
+    return dx
+
+def mask_to_host(mask, thresh: int = 0) -> np.ndarray:
+    """Return a mask in host memory.
+
+    Masks on the GPU (cv2.cuda_GpuMat) are binarized with `thresh` on
+    the device, so only the 8-bit result is downloaded. OpenCV has no
+    CUDA implementation of findContours, the download can't be avoided.
+    """
+    if hasattr(mask, 'download'):
+        _, mask = cv2.cuda.threshold(mask, thresh, 255, cv2.THRESH_BINARY)
+        mask = mask.download()
+    return mask
+
+def detect_contours(frame: Frame, min_area: int = None) -> List[np.ndarray]:
+    """Detect Contours of elements in an image.
+
+    Return a list of contours where every contour
+    is a numpy array of (x, y) coordinates.
+    """
+    mask = mask_to_host(frame.last)
+    contours, _ = cv2.findContours(mask,
+                                    cv2.RETR_TREE,
+                                    cv2.CHAIN_APPROX_SIMPLE)
+    if min_area is not None:
+        contours = [c for c in contours if cv2.contourArea(c) > min_area]
+    return contours
+
+def detect_objects(mask: np.ndarray,
+                   min_area: int = None,
+                   eps: float = 1.5,
+                   components: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """Detect objects in a binary image in a single pass.
+
+    Return the merged bboxes of shape (N, 4) as (x, y, w, h)
+    and their centroids of shape (N, 2). With `components` the bboxes
+    are detected with `detect_components` instead of `detect_bboxes`.
+    """
+    detect = detect_components if components else detect_bboxes
+    bboxes = merge_bboxes(detect(mask, min_area), eps=eps)
+    return bboxes, centroids_from_bboxes(bboxes)
+
+def detect_bboxes(mask: np.ndarray, min_area: int = None) -> np.ndarray:
+    """Detect bboxes of the outermost contours in a binary image.
+
+    Bboxes with an area of `min_area` or less are dropped. The area
+    of the bbox is used instead of the area of the contour, it is
+    cheaper to compute and an upper bound of the contour area.
+
+    Return the bboxes of shape (N, 4) as (x, y, w, h).
+    """
+    mask = mask_to_host(mask)
+    # contours inside of other contours end up in their bboxes anyway
+    contours, _ = cv2.findContours(mask,
+                                   cv2.RETR_EXTERNAL,
+                                   cv2.CHAIN_APPROX_SIMPLE)
+    bboxes = bboxes_from_polygons(contours)
+    if min_area is not None:
+        bboxes = bboxes[bboxes[:, 2] * bboxes[:, 3] > min_area]
+    return bboxes
+
+def detect_components(mask: np.ndarray, min_area: int = None) -> np.ndarray:
+    """Detect bboxes of the connected components in a binary image.
+
+    Components of `min_area` pixels or less are dropped. The bboxes
+    are the same as the ones of `detect_bboxes`, but bbox and pixel
+    area of all components are computed in a single pass over the
+    mask. The cost of the pass doesn't depend on the content, which
+    makes it faster for noisy masks and slower for sparse ones.
+
+    Return the bboxes of shape (N, 4) as (x, y, w, h).
+    """
+    mask = mask_to_host(mask)
+    _, _, stats, _ = cv2.connectedComponentsWithStats(mask,
+                                                      connectivity=8,
+                                                      ltype=cv2.CV_32S)
+    # label 0 is the background
+    stats = stats[1:]
+    if min_area is not None:
+        stats = stats[stats[:, cv2.CC_STAT_AREA] > min_area]
+    return np.ascontiguousarray(stats[:, :4])
+
+def draw_bboxes(frame: Frame, bboxes: List[np.ndarray], *, color=255):
+    """Draw bboxes on a frame."""
+    rectangle = cv2.rectangle
+    img = frame.original
+    bboxes = np.asarray(bboxes, dtype=np.int32).reshape(-1, 4)
+    # opposite corners of all bboxes at once, as plain ints
+    # because they are unpacked faster than numpy scalars
+    corners = np.hstack((bboxes[:, :2], bboxes[:, :2] + bboxes[:, 2:])).tolist()
+    for x1, y1, x2, y2 in corners:
+        rectangle(img, (x1, y1), (x2, y2), color, 2)
+
+def draw_object_ids(frame: Frame,
+                    ids: np.ndarray,
+                    centroids: np.ndarray,
+                    *,
+                    font: int = cv2.FONT_HERSHEY_SIMPLEX,
+                    color=255):
+    """Draw the IDs of objects at their centroids on a frame.
+
+    Parameters
+    ----------
+    frame : Frame
+    ids : np.ndarray
+        object IDs of shape (N,)
+    centroids : np.ndarray
+        last centroids of the objects of shape (N, 2)
+    """
+    putText, circle = cv2.putText, cv2.circle
+    img = frame.original
+    for objectID, (x, y) in zip(ids.tolist(), centroids.tolist()):
+        putText(img, f'ID {objectID}', (x - 20, y - 20), font, 0.6, color, 1)
+        circle(img, (x, y), 4, color, 2)
+
+def merge_bboxes(bboxes, eps: float = 1.5) -> np.ndarray:
+    """Merge all overlapping bboxes.
+
+    Every bbox is grown by `eps / 4` of its width and height on each
+    side, i.e. by `eps * size / 2` in total, before testing for overlap.
+    Bboxes that overlap, directly or through other bboxes, are
+    replaced by the bbox enclosing all of them.
+
+    Parameters
+    ----------
+    bboxes
+    eps : float
+        Defines how far away rectangles can be from each other
+        to be considered for grouping. When eps=0, only
+        rectangles that actually overlap are merged.
+
+    Returns
+    -------
+    np.ndarray
+        merged bboxes of shape (N, 4) as (x, y, w, h)
+
+    Notes
+    -----
+    Bboxes used to be merged with `cv2.groupRectangles`, where `eps`
+    is the relative difference in size and position up to which
+    bboxes are grouped, and each group became the average of its
+    bboxes. The same `eps` now gives different, usually larger
+    bboxes: groups are connected through overlaps of the grown
+    bboxes and become their enclosing bbox.
+    """
+    bboxes = np.asarray(bboxes, dtype=np.int32).reshape(-1, 4)
+    n = len(bboxes)
+    if n < 2:
+        # nothing to merge
+        return bboxes
+
+    x1, y1 = bboxes[:, 0], bboxes[:, 1]
+    x2, y2 = x1 + bboxes[:, 2], y1 + bboxes[:, 3]
+
+    # grow the bboxes and build the overlap matrix of all pairs
+    grow = np.float32(eps / 4)
+    dx, dy = grow * bboxes[:, 2], grow * bboxes[:, 3]
+    left, right = x1 - dx, x2 + dx
+    top, bottom = y1 - dy, y2 + dy
+    overlaps = ((left[:, None] < right) & (left < right[:, None]) &
+                (top[:, None] < bottom) & (top < bottom[:, None]))
+
+    # groups of bboxes connected directly or through other bboxes,
+    # found in a single pass over the overlap graph
+    n_groups, groups = connected_components(csr_matrix(overlaps), directed=False)
+
+    # enclosing bbox per group
+    gx1 = np.full(n_groups, np.iinfo(np.int32).max, dtype=np.int32)
+    gy1 = gx1.copy()
+    gx2 = np.full(n_groups, np.iinfo(np.int32).min, dtype=np.int32)
+    gy2 = gx2.copy()
+    np.minimum.at(gx1, groups, x1)
+    np.minimum.at(gy1, groups, y1)
+    np.maximum.at(gx2, groups, x2)
+    np.maximum.at(gy2, groups, y2)
+    return np.stack((gx1, gy1, gx2 - gx1, gy2 - gy1), axis=1)
+
+
+class IVisitor(metaclass=abc.ABCMeta):
+    """Analyze the transformed frames.
+
+    Parameters
+    ----------
+    apply_args : List[str], default = None
+        names of further methods that `apply` calls with
+        every frame, once per frame after its own analysis
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # names of the methods that can be used as `apply_args`,
+        # collected once per class instead of once per instance
+        cls._methods = frozenset(name for name, _ in
+                                 inspect.getmembers(cls, inspect.isroutine))
+
+    def __init__(self, apply_args: List[str] = None):
+        super().__init__()
+        self.apply_args = list(apply_args or [])
+
+        apply_fns = []
+        for arg in self.apply_args:
+            if arg == 'apply':
+                raise ValueError('`apply` calls the `apply_args`, '
+                                 'it can\'t be one of them.')
+            if arg not in self._methods:
+                if not hasattr(self, arg):
+                    raise AttributeError('One ore more of the specified `apply_args` '
+                                         'is not an attribute.')
+                raise TypeError('One or more of the specified `apply_args` '
+                                'is not a method.')
+            apply_fns.append(getattr(self, arg))
+        # bind the methods once instead of looking them up for every frame
+        self._apply_fns = tuple(apply_fns)
+
+    @abc.abstractmethod
+    def apply(self):
+        pass
+
+
+class CentroidTracker(IVisitor):
+    """Copied (and adjusted) from pyimagesearch.
+
+    https://www.pyimagesearch.com/2018/07/23/simple-object-tracking-with-opencv/
+    """
+    def __init__(self,
+                 min_area: int = None,
+                 eps: float = 1.5,
+                 maxDisappeared: int= 50,
+                 max_distance: float = None,
+                 components: bool = False,
+                 Session: sessionmaker = None,
+                 apply_args: List[str] = None):
+
+        super().__init__(apply_args)
+
+        # initialize the next unique object ID along with two ordered
+        # dictionaries used to keep track of mapping a given object
+        # ID to its centroid and number of consecutive frames it has
+        # been marked as "disappeared", respectively
+        self.min_area = min_area
+        self.eps = eps
+        # detect objects as connected components instead of contours
+        self.components = components
+        self.next_object_id: int = 0
+        self.finished_objects: OrderedDict[int, Object] = OrderedDict()
+        self.current_objects: OrderedDict[int, Object] = OrderedDict()
+
+        # IDs, last centroids and number of consecutive frames marked
+        # as "disappeared" of the currently tracked objects, stored
+        # as arrays with one row per object to match them per frame.
+        # Only the first `_n` rows are in use, the arrays double their
+        # capacity when full and rows of deregistered objects are
+        # filled with the last row
+        self._n = 0
+        self._ids = np.empty(64, dtype=np.int32)
+        self._centroids = np.empty((64, 2), dtype=np.int16)
+        self._disappeared = np.empty(64, dtype=np.int32)
+        self._slot_of_id: Dict[int, int] = {}
+
+        # masks of matched rows and columns, reused for every frame
+        self._row_used = np.zeros(256, dtype=bool)
+        self._col_used = np.zeros(256, dtype=bool)
+
+        # store the number of maximum consecutive frames a given
+        # object is allowed to be marked as "disappeared" until we
+        # need to deregister the object from tracking
+        self.maxDisappeared = maxDisappeared
+
+        # maximum distance in pixels between the centroids of an object
+        # in two frames, None to match objects regardless of distance
+        self.max_distance = max_distance
+
+        self.Session = Session
+
+    def apply(self, frame: Frame):
+        bboxes, centroids = detect_objects(frame.last, self.min_area, self.eps, self.components)
+        self.update(frame.video_id, frame.frame_no, bboxes, centroids)
+
+        if isinstance(frame.original, np.ndarray):
+            # frames from VideoLoaderCUDA stay on the GPU and are not drawn on
+            n = self._n
+            draw_bboxes(frame, bboxes)
+            draw_object_ids(frame, self._ids[:n], self._centroids[:n])
+
+        for fn in self._apply_fns:
+            fn(frame)
+
+        if self.Session and self.finished_objects:
+            objects = list(self.finished_objects.values())
+            self.finished_objects.clear()
+            with self.Session.begin() as session:
+                # return_defaults writes the new primary keys into the dicts
+                db_objects = [{} for _ in objects]
+                session.bulk_insert_mappings(DbObject, db_objects, return_defaults=True)
+                video_objects = []
+                for object, db_object in zip(objects, db_objects):
+                    for video_id in object.video_ids:
+                        # numpy arrays aren't JSON serializable
+                        video_objects.append(dict(video_id=video_id,
+                                                  object_id=db_object['id'],
+                                                  frames=object.frames(video_id).tolist(),
+                                                  bboxes=object.bboxes(video_id).tolist(),
+                                                  centroids=object.centroids(video_id).tolist()))
+                session.bulk_insert_mappings(VideoObject, video_objects)
+
+    def register(self, video_id, frame_no, bbox, centroid):
+        id = self.next_object_id
+        self.current_objects.\
+            setdefault(id, Object(id)).\
+            add(video_id, frame_no, bbox, centroid)
+
+        if self._n == len(self._ids):
+            capacity = 2 * len(self._ids)
+            self._ids = np.resize(self._ids, capacity)
+            self._centroids = np.resize(self._centroids, (capacity, 2))
+            self._disappeared = np.resize(self._disappeared, capacity)
+
+        slot = self._n
+        self._ids[slot] = id
+        self._centroids[slot] = centroid
+        self._disappeared[slot] = 0
+        self._slot_of_id[id] = slot
+        self._n += 1
+        self.next_object_id += 1
+
+    def deregister(self, object_id):
+        self.finished_objects[object_id] = self.current_objects.pop(object_id)
+
+        # move the last row into the slot of the object
+        slot = self._slot_of_id.pop(object_id)
+        last = self._n - 1
+        if slot != last:
+            moved_id = int(self._ids[last])
+            self._ids[slot] = self._ids[last]
+            self._centroids[slot] = self._centroids[last]
+            self._disappeared[slot] = self._disappeared[last]
+            self._slot_of_id[moved_id] = slot
+        self._n = last
+
+    def deregister_disappeared(self):
+        """Deregister all objects that disappeared for too long."""
+        n = self._n
+        gone = self._disappeared[:n] > self.maxDisappeared
+        for object_id in self._ids[:n][gone].tolist():
+            self.deregister(object_id)
+
+    @property
+    def disappeared_objects(self) -> OrderedDict[int, int]:
+        """Number of consecutive frames each object has been missing."""
+        n = self._n
+        return OrderedDict(zip(self._ids[:n].tolist(), self._disappeared[:n].tolist()))
+
+    def update(self, video_id, frame_no, bboxes, centroids=None):
+        if len(bboxes) == 0:
+            # mark all existing tracked objects as disappeared
+            self._disappeared[:self._n] += 1
+
+            # if we have reached a maximum number of consecutive
+            # frames where a given object has been marked as
+            # missing, deregister it
+            self.deregister_disappeared()
+
+            # return early as there are no centroids or tracking info
+            # to update
+            return self.current_objects
+
+        if centroids is None:
+            centroids = centroids_from_bboxes(bboxes)
+        inputCentroids = centroids
+
+        # if we are currently not tracking any objects take the input
+        # centroids and register each of them
+        if self._n == 0:
+            for i in range(0, len(inputCentroids)):
+                self.register(video_id, frame_no, bboxes[i], inputCentroids[i])
+
+        # otherwise, are are currently tracking objects so we need to
+        # try to match the input centroids to existing object
+        # centroids
+        else:
+            # compute the (squared) distance between each pair of object
+            # centroids and input centroids, respectively -- our
+            # goal will be to match an input centroid to an existing
+            # object centroid
+            D = squared_distances(self._centroids[:self._n], inputCentroids)
+
+            # pairs that are too far apart are not the same object, they
+            # get a cost higher than any assignment of close pairs so
+            # they don't take the place of valid matches
+            if self.max_distance is not None:
+                gate = self.max_distance ** 2
+                far = D > gate
+                D[far] = gate * (min(D.shape) + 1)
+
+            # find the assignment of object centroids to input centroids
+            # with the smallest total distance, every object and every
+            # input centroid is assigned at most once
+            rows, cols = linear_sum_assignment(D)
+
+            if self.max_distance is not None:
+                close = ~far[rows, cols]
+                rows, cols = rows[close], cols[close]
+
+            # grab the object ID for every matched row, set its
+            # new centroid, and reset the disappeared counter
+            for row, col in zip(rows.tolist(), cols.tolist()):
+                objectID = int(self._ids[row])
+                self.current_objects[objectID].add(video_id, frame_no, bboxes[col], inputCentroids[col])
+            self._centroids[rows] = inputCentroids[cols]
+            self._disappeared[rows] = 0
+
+            # compute both the row and column index that were NOT matched
+            R, C = D.shape
+            if R > len(self._row_used):
+                self._row_used = np.zeros(2 * R, dtype=bool)
+            if C > len(self._col_used):
+                self._col_used = np.zeros(2 * C, dtype=bool)
+            rowUsed, colUsed = self._row_used[:R], self._col_used[:C]
+            rowUsed[:] = False
+            colUsed[:] = False
+            rowUsed[rows] = True
+            colUsed[cols] = True
+            unusedRows = np.flatnonzero(~rowUsed)
+            unusedCols = np.flatnonzero(~colUsed)
+
+            # objects without a match have potentially disappeared,
+            # input centroids without a match are new objects
+            self._disappeared[unusedRows] += 1
+            for col in unusedCols.tolist():
+                self.register(video_id, frame_no, bboxes[col], inputCentroids[col])
+
+            # check to see if the number of consecutive
+            # frames an object has been marked "disappeared"
+            # for warrants deregistering the object
+            self.deregister_disappeared()
+
+        # return the set of trackable objects
+        return self.current_objects
+
+
+@dataclass
+class VideoAnalysis:
+
+    exclude_area: List[int] = None
+    road_area: List[int] = None
+    setting_noise_reduction: int = None
+    stream: VideoLoader = field(init=False)
+
+
+# What should the data structure look like?
+"""
+# TODO: define a better structure for video list
+# Goal2: it should be possible to define max-time-gap between two videos
+#   to decide whether to treat them separately
+
+videos = {
+    id: {
+        'path':,
+        'datetime':, # timediff is easier to calculate
+        'fps':,
+        'duration':,
+    }
+}
+
+active_objects = {
+    id: {
+        'video_ids': [],
+        'video_paths': [],
+        'coordinates':,
+        'bboxes':,
+        'images':,
+        'starttime':,
+        'endtime':,
+        'starttime_in_video':,
+        'endtime_in_video':
+    }
+}
+
+collected_objects = [
+    {
+        'id':,
+        'video_ids':,
+        'video_paths':,
+        'coordinates':,
+        'bboxes':,
+        'images':,
+        'starttime':,
+        'endtime':,
+        'starttime_in_video':,
+        'endtime_in_video':
+    },
+     ]},
+]
 """
\ No newline at end of file
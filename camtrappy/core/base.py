@@ -1,347 +1,1155 @@
-from __future__ import annotations
-from collections import defaultdict, OrderedDict
-from camtrappy.core.transforms import ITransform, Resize, TransformFactory
-
-import time
-
-from dataclasses import dataclass, field, InitVar
-from datetime import date as Date, time as Time
-from operator import attrgetter
-from pydantic.dataclasses import dataclass as dataclass_pydantic
-from sqlalchemy.orm import sessionmaker
-from typing import Any, Dict, Generator, List, Tuple
-from threading import Thread, settrace
-from queue import Queue
-
-import cv2
-import numpy as np
-
-from camtrappy.db.schema import Video, Location, Project
-
-
-def location_id_by_name(Session, name):
-    # TODO: account for possibility that a location can have the same name
-    # but belong to a different project!
-    with Session.begin() as session:
-        q = session.query(Location)\
-            .where(Location.name == name)\
-            .one()
-        id = q.id
-    return id
-
-def get_videos(Session, location_id):
-    with Session.begin() as session:
-        q = session.query(Video)\
-            .where(Video.location_id == location_id)\
-            .order_by(Video.date, Video.time)
-    return q.all()
-
-@dataclass
-class VideoList:
-
-    Session: InitVar[sessionmaker]
-    location_id: InitVar[int]
-    videos: List[Video] = field(init=False)
-    idx: int = field(init=False)
-
-    def __post_init__(self, Session, location_id):
-        # idx is needed for __next__ and __iter__
-        self.idx = 0
-        self.videos = get_videos(Session, location_id)
-
-    def __iter__(self):
-        # makes "for x in VideoList" possible
-        return self
-
-    def __len__(self):
-        return len(self.videos)
-
-    def __next__(self):
-        # required for __iter__ to work
-        # can also be used for "next(VideoList)"
-        try:
-            item = self.videos[self.idx]
-        except IndexError:
-            self.idx = 0
-            raise StopIteration()
-        self.idx += 1
-        return item
-
-    def __nonzero__(self):
-        # VideoList can be evaluated to True/False
-        return bool(self.videos)
-
-    def __repr__(self):
-        return f'{self.videos}'
-
-    def to_dict(self, list_of_dicts: bool = False) -> Dict[int, Dict[str, Any]]:
-        """Return a dict of videos.
-
-        Dictionary of dictionaries structure is
-            {id: {attribute_name: attribute}}
-        """
-        # use walrus operator to create a nested dict in one expression
-        # create flat dict attributes
-        # pop id and nest the rest of the attributes below id
-        # {id: {attribute_name: attribute}}
-        return {(attributes := v.to_dict()).pop('id'): dict(**attributes)
-                for v in self.videos}
-
-
-@dataclass
-class Object:
-
-    id: int
-    _data: OrderedDict = field(default_factory=OrderedDict)
-
-    def add(self, video_id, frame_no, bbox, centroid):
-        video = self._data.setdefault(video_id, OrderedDict())
-        video.setdefault('frames', list()).append(frame_no)
-        video.setdefault('bboxes', list()).append(bbox)
-        video.setdefault('centroids', list()).append(centroid)
-
-    def bboxes(self, video_id):
-        return self._data[video_id]['bboxes']
-
-    def centroids(self, video_id):
-        return self._data[video_id]['centroids']
-
-    def frames(self, video_id):
-        return self._data[video_id]['frames']
-
-    @property
-    def last_bbox(self):
-        video_id = next(reversed(self._data))
-        return self.bboxes(video_id)[-1]
-
-    @property
-    def last_centroid(self):
-        video_id = next(reversed(self._data))
-        return self.centroids(video_id)[-1]
-
-    @property
-    def video_ids(self):
-        return list(self._data.keys())
-
-
-@dataclass
-class Frame:
-    """Behaves like a list."""
-
-    video_id: int
-    frame_no: int
-    _data: List[np.ndarray]
-
-    @property
-    def original(self):
-        return self._data[0]
-
-    @original.setter
-    def original(self, frame):
-        self._data[0] = frame
-
-    @property
-    def last(self):
-        return self._data[-1]
-
-    def __getattr__(self, method):
-        return getattr(self._data, method)
-
-    def __len__(self):
-        return len(self._data)
-
-    def __getitem__(self, item):
-        return self._data[item]
-
-    def __setitem__(self, item, value):
-        self._data[item] = value
-
-
-@dataclass
-class VideoLoader(VideoList):
-    """Adapted from imutils.video.filevideostream, with modifications.
-
-    Parameters
-    ----------
-    skip_frames : int, default = 9
-        define how many frames to skip to speedup analysis
-    transform : Any
-        # TODO: define how to supply transforms
-    queue_size : int, default = 500
-        max number of frames in the queue
-    """
-
-    # TODO: implement arg=single:
-    #     Restart object trackers after every single video.
-
-    skip_n_frames: int = 9
-    transforms: TransformFactory = None
-    queue_size: int = 500
-
-    def __post_init__(self, Session, location_id):
-        super().__post_init__(Session, location_id)
-
-    def start(self, single=False):
-        """Start the update-method within a thread."""
-        self.Q = Queue(maxsize=self.queue_size)
-        self.thread = Thread(target=self.update, args=())
-        self.thread.daemon = True
-        self.stopped: bool = False
-        self.thread.start()
-
-    def update(self):
-        """Loop over the frames in a sequence of files."""
-        # TODO: add frame number counting
-
-        video = next(self, None)
-        self.stream = cv2.VideoCapture(video.fullpath)
-
-        while True:
-
-            if self.stopped:
-                break
-
-            if self.Q.full():
-                # print('Queue is full, waiting...')
-                time.sleep(0.1)
-
-            # grab frame if queue is not full
-            else:
-                self.skip_frames(self.skip_n_frames) # skip `self.skip_n_frames`
-
-                grabbed, raw_frame = self.stream.read() # grab next frame from file
-
-                if grabbed: # if there was a frame to grab
-                    # get frame number
-                    frame_no = self.stream.get(cv2.CAP_PROP_POS_FRAMES)
-                    # convert to grayscale
-                    raw_frame = cv2.cvtColor(raw_frame, cv2.COLOR_BGR2GRAY)
-
-                    frame = Frame(video.id, frame_no, [raw_frame])
-
-                    # do transforms on it
-                    if self.transforms:
-                        frame = self.transforms.transform(frame)
-
-                    # add the frame to the queue
-                    self.Q.put(frame)
-
-                else: # `grabbed` is False, end of file reached
-                    self.stream.release() # stop file-access on exhausted file
-                    video = next(self, None)
-                    if video:
-                        self.stream = cv2.VideoCapture(video.fullpath)
-                    else:
-                        self.stopped = True
-
-        # release the final stream
-        self.stream.release()
-
-    def read(self):
-        """Return next frame in the queue."""
-        return self.Q.get(timeout=0.5) # (video_id, frame)
-
-    def more(self):
-        """Return True if queue not empty or stream not stopped."""
-        return self._running() or not self.stopped
-
-    def _running(self):
-        """Return True if there are still frames in the queue."""
-        tries = 0
-        # If queue is empty but stream still running, wait a moment
-        while self.Q.empty() and not self.stopped and tries < 5:
-            time.sleep(0.1)
-            tries += 1
-        return self.Q.empty()
-
-    def skip_frames(self, n):
-        for _ in range(n):
-            _, _ = self.stream.read()
-
-    def stop(self):
-        # tell the thread to stop
-        self.stopped = True
-        # wait for the stream resources to be released
-        self.thread.join()
-
-    def reset(self):
-        self.idx = 0
-
-
-@dataclass
-class VideoPlayer:
-
-    vl: VideoLoader
-
-    def play(self,
-             resize: Resize = True,
-             transforms: TransformFactory = None,
-             compare: bool = True,
-             visitor=None):
-
-        self.vl.start()
-
-        # loop over frames from the video file stream
-        while self.vl.more():
-            try:
-                frame = self.vl.read()
-                out_frame = frame.last
-            except:
-                break
-
-            if resize:
-                frame.original = resize.transform(frame.original)
-
-            if transforms:
-                frame = transforms.transform(frame)
-
-                if visitor:
-                    visitor.apply(frame)
-
-                if compare:
-                    for i, t in enumerate(transforms.transforms, 1):
-                        name = type(t).__name__
-                        self.put_text(frame[i], Transform=name)
-
-                    if len(frame) % 2 != 0:
-                        frame.append(np.zeros(frame.original.shape, dtype=frame.original.dtype))
-                    size = len(frame)
-                    left, right = frame[:size//2], frame[size//2:]
-                    out_frame = np.vstack((np.hstack(left), np.hstack(right)))
-                else:
-                    out_frame = frame.original
-
-            self.put_text(out_frame,
-                          QueueSize=self.vl.Q.qsize(),
-                          VideoID=frame.video_id)
-            cv2.imshow("Frame", out_frame)
-
-            self.act_on_key()
-
-        # do a bit of cleanup
-        self.close()
-
-    def close(self):
-        cv2.destroyAllWindows()
-        self.vl.stop()
-        self.vl.reset()
-
-    def put_text(self, frame, **kwargs):
-        x, y = 10, 30
-        for k, v in kwargs.items():
-            cv2.putText(frame, f"{k}: {v}",
-                (x, y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, 255, 2)
-            y += 20
-
-    def act_on_key(self):
-        paused = False
-        while True:
-            k = cv2.waitKey(1)
-            if k == 27 or k == ord('q'): # press 'ESC' or 'q' to close
-                self.close()
-                break
-            if k == ord(' '): # pause/unpause with 'space'
-                paused = True if not paused else False
-            if not paused:
-                break
-            time.sleep(0.1)
+from __future__ import annotations
+from collections import defaultdict, deque, OrderedDict
+from camtrappy.core.buffers import FramePool, PinnedFramePool, RingBuffer
+from camtrappy.core.transforms import ITransform, Resize, TransformFactory
+
+import os
+import subprocess
+import time
+import warnings
+
+from dataclasses import dataclass, field, InitVar
+from datetime import date as Date, time as Time
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, sessionmaker
+from typing import Any, Dict, Generator, List, Tuple, Union
+from threading import Lock, Thread, settrace
+from queue import Empty, Full, Queue
+
+import cv2
+import ffmpeg
+import numpy as np
+
+from camtrappy.db.schema import Video, Location, Project
+
+# options set by the user take precedence over our own, they are read
+# before `open_stream` sets the variable for the first time
+_USER_CAPTURE_OPTIONS = os.environ.get('OPENCV_FFMPEG_CAPTURE_OPTIONS')
+# held while the variable holds the options of one loader,
+# loaders running in parallel open their videos one at a time
+_CAPTURE_OPTIONS_LOCK = Lock()
+
+
+def location_id_by_name(Session, name):
+    # TODO: account for possibility that a location can have the same name
+    # but belong to a different project!
+    with Session() as session:
+        return session.execute(
+            select(Location.id).where(Location.name == name)
+        ).scalar_one()
+
+# column with the full path of a video, `get_videos` joins
+# the location and project of the videos for plain rows
+FULLPATH = (Project.datafolder + os.sep + Location.folder + os.sep
+            + Video.path).label('fullpath')
+
+def get_videos(Session, location_id, *columns):
+    """Return the videos of a location in chronological order.
+
+    Returns Video instances, or plain rows if `columns` are given.
+    Rows skip the ORM bookkeeping of full instances, use `FULLPATH`
+    as column for the full path of the videos.
+    """
+    if columns:
+        stmt = select(*columns)\
+            .join(Video.location)\
+            .join(Location.project)
+    else:
+        # loaded with the videos, the instances are used after the
+        # session is closed and Video.fullpath needs both
+        stmt = select(Video)\
+            .options(joinedload(Video.location).joinedload(Location.project))
+    stmt = stmt.where(Video.location_id == location_id)\
+        .order_by(Video.date, Video.time)
+    with Session() as session:
+        result = session.execute(stmt)
+        return result.all() if columns else result.scalars().all()
+
+def cuda_decoding_available() -> bool:
+    """Return True if OpenCV can decode videos on a CUDA device."""
+    return hasattr(cv2, 'cudacodec') and cv2.cuda.getCudaEnabledDeviceCount() > 0
+
+# values of cv::CpuFeatures, which are not exported to Python
+CPU_AVX2, CPU_NEON = 11, 100
+
+def simd_available() -> bool:
+    """Return True if OpenCV uses its AVX2 (x86) or NEON (ARM) code paths.
+
+    The color conversion, resizing and thresholds of the loader and
+    the transforms are dispatched to these at runtime. Otherwise see
+    the "CPU/HW features" of `cv2.getBuildInformation()`, the OpenCV
+    packages of conda-forge are built with AVX2 dispatch.
+    """
+    return cv2.useOptimized() and (cv2.checkHardwareSupport(CPU_AVX2)
+                                   or cv2.checkHardwareSupport(CPU_NEON))
+
+@dataclass
+class VideoList:
+
+    Session: InitVar[sessionmaker]
+    location_id: InitVar[int]
+    videos: List[Video] = field(init=False)
+
+    # columns to fetch instead of Video instances, see `get_videos`
+    COLUMNS = ()
+
+    def __post_init__(self, Session, location_id):
+        self.videos = get_videos(Session, location_id, *self.COLUMNS)
+
+    def __iter__(self):
+        # makes "for x in VideoList" possible,
+        # a new iterator every time, so loops can be nested
+        return iter(self.videos)
+
+    def __len__(self):
+        return len(self.videos)
+
+    def __bool__(self):
+        # VideoList can be evaluated to True/False
+        return bool(self.videos)
+
+    def __repr__(self):
+        return f'{self.videos}'
+
+    def chronological(self) -> List[Video]:
+        """Return the videos sorted by date and time."""
+        return sorted(self.videos, key=Video.sort_key)
+
+    def to_dict(self, list_of_dicts: bool = False
+                ) -> Union[Dict[int, Dict[str, Any]], List[Dict[str, Any]]]:
+        """Return a dict of videos.
+
+        Dictionary of dictionaries structure is
+            {id: {attribute_name: attribute}}
+        With `list_of_dicts` a list of `Video.to_dict` is returned.
+        """
+        if list_of_dicts:
+            # same as Video.to_dict, but works for rows as well
+            return [dict(id=v.id, path=v.path, date=v.date, time=v.time,
+                         fps=v.fps, duration=v.duration)
+                    for v in self.videos]
+        # a single dict per video, nested below its id
+        # {id: {attribute_name: attribute}}
+        return {v.id: dict(path=v.path, date=v.date, time=v.time,
+                           fps=v.fps, duration=v.duration)
+                for v in self.videos}
+
+
+@dataclass
+class Object:
+    """Track of a single object, stored per video.
+
+    Frame numbers, bboxes and centroids of a video are kept in numpy
+    arrays that grow by doubling their capacity. The accessors return
+    views on the filled rows, shape (N,), (N, 4) and (N, 2).
+    """
+
+    id: int
+    _data: OrderedDict = field(default_factory=OrderedDict)
+
+    # initial number of rows per video
+    CAPACITY = 16
+
+    def add(self, video_id, frame_no, bbox, centroid):
+        video = self._data.get(video_id)
+        if video is None:
+            video = self._data[video_id] = dict(
+                n=0,
+                frames=np.empty(self.CAPACITY, dtype=np.int64),
+                bboxes=np.empty((self.CAPACITY, 4), dtype=np.int32),
+                centroids=np.empty((self.CAPACITY, 2), dtype=np.int16))
+        n = video['n']
+        if n == len(video['frames']):
+            video['frames'] = np.resize(video['frames'], 2 * n)
+            video['bboxes'] = np.resize(video['bboxes'], (2 * n, 4))
+            video['centroids'] = np.resize(video['centroids'], (2 * n, 2))
+        video['frames'][n] = frame_no
+        video['bboxes'][n] = bbox
+        video['centroids'][n] = centroid
+        video['n'] = n + 1
+
+    def bboxes(self, video_id) -> np.ndarray:
+        video = self._data[video_id]
+        return video['bboxes'][:video['n']]
+
+    def centroids(self, video_id) -> np.ndarray:
+        video = self._data[video_id]
+        return video['centroids'][:video['n']]
+
+    def frames(self, video_id) -> np.ndarray:
+        video = self._data[video_id]
+        return video['frames'][:video['n']]
+
+    @property
+    def last_bbox(self):
+        video_id = next(reversed(self._data))
+        return self.bboxes(video_id)[-1]
+
+    @property
+    def last_centroid(self):
+        video_id = next(reversed(self._data))
+        return self.centroids(video_id)[-1]
+
+    @property
+    def video_ids(self):
+        return list(self._data.keys())
+
+
+@dataclass
+class Frame:
+    """Behaves like a list."""
+
+    video_id: int
+    frame_no: int
+    _data: List[np.ndarray]
+
+    @property
+    def original(self):
+        return self._data[0]
+
+    @original.setter
+    def original(self, frame):
+        self._data[0] = frame
+
+    @property
+    def last(self):
+        return self._data[-1]
+
+    # list methods are delegated explicitly, a __getattr__ fallback
+    # would be called for every missing attribute, e.g. by copy and pickle
+    def append(self, frame):
+        self._data.append(frame)
+
+    def extend(self, frames):
+        self._data.extend(frames)
+
+    def pop(self, index=-1):
+        return self._data.pop(index)
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __getitem__(self, item):
+        return self._data[item]
+
+    def __setitem__(self, item, value):
+        self._data[item] = value
+
+    def upload(self, stream=None):
+        """Upload the original frame to the GPU.
+
+        With a `cv2.cuda_Stream` the upload runs asynchronously if the
+        frame is in page-locked memory (`VideoLoader(pinned_memory=True)`).
+        Keep the frame alive until the stream is synchronized.
+        """
+        gpu_frame = cv2.cuda_GpuMat()
+        if stream is None:
+            gpu_frame.upload(self.original)
+        else:
+            gpu_frame.upload(self.original, stream)
+        return gpu_frame
+
+
+@dataclass
+class VideoLoader(VideoList):
+    """Adapted from imutils.video.filevideostream, with modifications.
+
+    Parameters
+    ----------
+    skip_frames : int, default = 9
+        define how many frames to skip to speedup analysis
+    transform : Any
+        # TODO: define how to supply transforms
+    queue_size : int, default = 500
+        max number of frames in the queue
+    batch_size : int, default = 1
+        number of frames put into the queue at once, reduces the
+        synchronization between the threads. Frames of different
+        videos are never batched together. `read` still returns
+        single frames, `read_batch` returns the batches
+    hw_accel : int, default = cv2.VIDEO_ACCELERATION_ANY
+        hardware acceleration used for decoding, pass
+        `cv2.VIDEO_ACCELERATION_NONE` to force software decoding.
+        A specific decoder can also be forced with the environment
+        variable OPENCV_FFMPEG_CAPTURE_OPTIONS, e.g. "video_codec;h264_cuvid".
+    hw_device : int, default = -1
+        index of the device used for hardware accelerated decoding,
+        -1 lets the backend choose. Select a GPU on multi-GPU machines
+        or spread several loaders over the GPUs. Requires a specific
+        `hw_accel`, e.g. `cv2.VIDEO_ACCELERATION_D3D11`, OpenCV refuses
+        to open videos with a device and `VIDEO_ACCELERATION_ANY`
+    pinned_memory : bool, default = False
+        decode into page-locked memory for asynchronous uploads
+        to the GPU with `Frame.upload`, requires OpenCV built with CUDA
+    preallocate : int, default = 0
+        number of frame buffers allocated when the loader is started,
+        saves allocating (and page-locking) them while decoding. The
+        pool grows on demand beyond that, up to about `queue_size`
+    drop_on_full : bool, default = False
+        drop the oldest frame in the queue instead of waiting when the
+        queue is full, keeps the latency low if the consumer is too slow
+    decoder_threads : int, default = os.cpu_count() // 2
+        number of FFmpeg decoding threads per video. Every open video
+        uses its own threads, keep their sum below the number of cores
+        when running several loaders in parallel
+    fast_decode : bool, default = False
+        let FFmpeg skip the deblocking filter and frames that are not
+        referenced by other frames (skip_loop_filter=all,
+        skip_frame=nonref, flags=low_delay). Decoding gets considerably
+        faster, but the frames show block artifacts and the number
+        of decoded frames depends on the structure of the video
+    seek_strategy : str, default = 'auto'
+        how frames are skipped: 'grab' decodes all skipped frames,
+        'seek' sets the frame position and lets FFmpeg jump to the
+        preceding keyframe, 'auto' seeks for skips of at least
+        `SEEK_THRESHOLD` frames. Use 'grab' if frame numbers have to
+        be exact, seeking is only as precise as the container index
+    target_size : Tuple[int, int], default = None
+        (width, height) of the frames, frames are scaled down right
+        after decoding, before the grayscale conversion. NVDEC scales
+        in hardware with VideoLoaderCUDA
+    luma_only : bool, default = False
+        let the decoder return the luma plane instead of BGR frames,
+        saves the color conversion of every frame. Luma of most videos
+        ranges from 16 to 235 instead of 0 to 255, thresholds and other
+        transforms may have to be adjusted
+    open_ahead : int, default = 1
+        number of videos opened ahead of the one being decoded. Raise
+        it for short clips on slow storage, where opening a video can
+        take longer than decoding it. Every open video holds its
+        decoder threads and buffers
+    readahead_size : int, default = 4 MiB
+        number of bytes at the start of the following video that the
+        OS is asked to read into the page cache while the current ones
+        are opened, see `readahead`. 0 disables the hint
+
+    Notes
+    -----
+    The grayscale frames are written into recycled buffers of a `FramePool`.
+    Copy parts of `frame.original` that have to outlive the frame.
+
+    All videos of a location are expected to come from the same camera.
+    The frame shape (`frame_shape`) and `fps` are read from the first
+    video when the loader is started.
+
+    The videos are read in chronological order. While one video is
+    decoded, the next `open_ahead` videos are already opened in a second
+    thread, so the decoder doesn't wait for the container to be opened.
+
+    With `transforms`, decoding and transforming run in separate
+    threads connected by a queue of `TRANSFORM_QUEUE_SIZE` frames,
+    the next frame is decoded while the current one is transformed.
+    """
+
+    # TODO: implement arg=single:
+    #     Restart object trackers after every single video.
+
+    skip_n_frames: int = 9
+    transforms: TransformFactory = None
+    queue_size: int = 500
+    batch_size: int = 1
+    hw_accel: int = getattr(cv2, 'VIDEO_ACCELERATION_ANY', 1)
+    hw_device: int = -1
+    pinned_memory: bool = False
+    preallocate: int = 0
+    drop_on_full: bool = False
+    decoder_threads: int = max(1, (os.cpu_count() or 2) // 2)
+    fast_decode: bool = False
+    seek_strategy: str = 'auto'
+    target_size: Tuple[int, int] = None
+    luma_only: bool = False
+    open_ahead: int = 1
+    readahead_size: int = 4 << 20
+
+    # smallest skip for which seeking beats grabbing with seek_strategy='auto',
+    # roughly the keyframe interval of camera trap videos
+    SEEK_THRESHOLD = 30
+    # decoded frames waiting for the transforms, the
+    # backlog of transformed frames is kept in `Q`
+    TRANSFORM_QUEUE_SIZE = 32
+    # the videos are only read, plain rows are enough
+    COLUMNS = (Video.id, FULLPATH, Video.path, Video.date,
+               Video.time, Video.fps, Video.duration)
+
+    @classmethod
+    def create(cls, Session, location_id, backend: str = 'auto', **kwargs) -> VideoLoader:
+        """Return a VideoLoader for the given decoding backend.
+
+        Parameters
+        ----------
+        backend : str, default = 'auto'
+            'cpu' for a VideoLoader, 'cuda' for a VideoLoaderCUDA that
+            decodes with NVDEC and keeps the frames on the GPU, 'ffmpeg'
+            for a VideoLoaderFFmpeg that reads from an ffmpeg process,
+            'auto' for 'cuda' if it is available and 'cpu' otherwise
+        kwargs
+            passed on to the loader
+        """
+        if backend == 'auto':
+            backend = 'cuda' if cuda_decoding_available() else 'cpu'
+        if backend == 'cuda':
+            return VideoLoaderCUDA(Session, location_id, **kwargs)
+        if backend == 'ffmpeg':
+            return VideoLoaderFFmpeg(Session, location_id, **kwargs)
+        if backend == 'cpu':
+            return VideoLoader(Session, location_id, **kwargs)
+        raise ValueError(f"Unknown backend '{backend}', "
+                         "use 'cpu', 'cuda', 'ffmpeg' or 'auto'.")
+
+    def __post_init__(self, Session, location_id):
+        if (self.hw_device >= 0
+                and self.hw_accel == getattr(cv2, 'VIDEO_ACCELERATION_ANY', 1)):
+            raise ValueError('hw_device requires a specific hw_accel, '
+                             'not VIDEO_ACCELERATION_ANY.')
+        super().__post_init__(Session, location_id)
+
+    def capture_options(self) -> str:
+        """Return the options for OPENCV_FFMPEG_CAPTURE_OPTIONS.
+
+        Options are given as "key;value" pairs separated by "|".
+        """
+        options = {}
+        if not hasattr(cv2, 'CAP_PROP_N_THREADS'):
+            # OpenCV builds < 4.7 only read the thread count from the environment
+            options['threads'] = self.decoder_threads
+        if self.fast_decode:
+            options['skip_loop_filter'] = 'all'
+            options['skip_frame'] = 'nonref'
+            options['flags'] = 'low_delay'
+        if _USER_CAPTURE_OPTIONS:
+            for option in _USER_CAPTURE_OPTIONS.split('|'):
+                if ';' in option:
+                    key, value = option.split(';', 1)
+                    options[key] = value
+                elif option:
+                    # e.g. a missing value, empty entries are skipped silently
+                    warnings.warn(f'Ignoring the capture option "{option}", '
+                                  'options are given as "key;value".')
+        return '|'.join(f'{k};{v}' for k, v in options.items())
+
+    def start(self, single=False):
+        """Start the update-method within a thread."""
+        if not self.videos:
+            # the first video is needed for the frame shape and fps
+            raise ValueError('The location has no videos to load.')
+        # dropping frames takes them out of the queue from the producer
+        # side, the ring buffer only supports a single consumer
+        # with batches the queue holds lists of frames
+        maxsize = -(-self.queue_size // self.batch_size)
+        if self.drop_on_full:
+            self.Q = Queue(maxsize=maxsize)
+        else:
+            self.Q = RingBuffer(maxsize)
+        self._batch = []
+        # frames of the last batch that haven't been read yet
+        self._pending = deque()
+        self.pool = PinnedFramePool() if self.pinned_memory else FramePool()
+        self._raw_frame = None
+        self._small_frame = None
+        # raised by `read` once the frames before it are consumed
+        self._error = None
+
+        # shared by `start` and the opener thread
+        self._videos = iter(self.videos)
+        video = next(self._videos, None)
+        self.stream = self.open_stream(video.fullpath)
+        self.probe()
+        self.pool.reserve(self.preallocate, self.frame_shape)
+
+        self.stopped: bool = False
+        # set by `stop`, `stopped` is also set at the end of the last video
+        self._cancelled = False
+        # opened streams of the following videos
+        self._streams = Queue(maxsize=max(1, self.open_ahead))
+        self.opener = Thread(target=self.open_videos, args=())
+        self.opener.daemon = True
+        self.opener.start()
+
+        self.threads = [Thread(target=self.update, args=(video,))]
+        if self.transforms:
+            self._decoded = RingBuffer(self.TRANSFORM_QUEUE_SIZE)
+            self.threads.append(Thread(target=self.transform_frames, args=()))
+        for thread in self.threads:
+            thread.daemon = True
+            thread.start()
+
+    def open_videos(self):
+        """Open the remaining videos ahead of `update`."""
+        try:
+            upcoming = next(self._videos, None)
+            while upcoming is not None:
+                video, upcoming = upcoming, next(self._videos, None)
+                # the file after this one is read from disk while the
+                # opened stream waits for `update`
+                if upcoming is not None:
+                    self.readahead(upcoming.fullpath)
+                stream = self.open_stream(video.fullpath)
+                if not self._put_stream((video, stream)):
+                    # stopped, `update` won't take the stream anymore
+                    self.release_stream(stream)
+                    return
+        except BaseException as error:
+            self._error = error
+        finally:
+            # no more videos, also ends `update` if opening one failed
+            self._put_stream(None)
+
+    def readahead(self, path: str):
+        """Let the OS load the start of a file into the page cache.
+
+        Only a hint, opening the file later hits the cache instead
+        of the disk. Does nothing where `os.posix_fadvise` is not
+        available, e.g. on Windows.
+        """
+        if not self.readahead_size or not hasattr(os, 'posix_fadvise'):
+            return
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.posix_fadvise(fd, 0, self.readahead_size, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+
+    def _put_stream(self, item):
+        """Wait for `update` to take the next stream, unless stopped."""
+        while not self.stopped:
+            try:
+                self._streams.put(item, timeout=0.1)
+                return True
+            except Full:
+                pass
+        return False
+
+    def _get_stream(self):
+        """Wait for the opener to hand over the next stream, unless stopped."""
+        while not self.stopped:
+            try:
+                return self._streams.get(timeout=0.1)
+            except Empty:
+                pass
+        return None
+
+    def update(self, video):
+        """Loop over the frames in a sequence of files."""
+        # TODO: add frame number counting
+
+        # everything that stays the same for all frames is looked up once,
+        # the methods read the current `self.stream` themselves
+        skip_frames, read_frame = self.skip_frames, self.read_frame
+        n = self.skip_n_frames
+        # hand the frames over to the transforms or directly to the consumer
+        emit = self._decoded.put if self.transforms else self._enqueue
+        video_id = video.id
+
+        try:
+            while not self.stopped:
+                skip_frames(n) # skip `self.skip_n_frames`
+
+                # grab next frame from file
+                grabbed, frame_no, raw_frame = read_frame()
+
+                if grabbed: # if there was a frame to grab
+                    emit(Frame(video_id, frame_no, [raw_frame]))
+
+                else: # `grabbed` is False, end of file reached
+                    self.close_stream() # stop file-access on exhausted file
+                    item = self._get_stream()
+                    if item:
+                        video, self.stream = item
+                        video_id = video.id
+                    else:
+                        self.stopped = True
+        except BaseException as error:
+            self._error = error
+        finally:
+            # release the final stream
+            self.close_stream()
+            # tell the consumer that no more frames will follow
+            if self.transforms:
+                self._decoded.put(None)
+            else:
+                self._flush()
+                self.Q.put(None)
+
+    def transform_frames(self):
+        """Apply the transforms to the decoded frames."""
+        try:
+            while True:
+                frame = self._decoded.get()
+                if frame is None:
+                    break
+                # after a stop the remaining frames are only taken
+                # out of the way of the decoding thread
+                if not self._cancelled:
+                    self._enqueue(self.transforms.transform(frame))
+        except BaseException as error:
+            self._error = error
+            # end the decoding thread, which may wait for room in the buffer
+            self.stopped = True
+            while self._decoded.get() is not None:
+                pass
+        finally:
+            self._flush()
+            self.Q.put(None)
+
+    def _enqueue(self, frame):
+        """Add a frame to the queue, or to the current batch."""
+        if self.batch_size == 1:
+            self._put(frame)
+            return
+        if self._batch and self._batch[-1].video_id != frame.video_id:
+            self._flush()
+        self._batch.append(frame)
+        if len(self._batch) == self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        """Add the current batch to the queue."""
+        if self._batch:
+            self._put(self._batch)
+            self._batch = []
+
+    def _put(self, item):
+        """Add an item to the queue.
+
+        Either drops the oldest item or waits for the consumer
+        to make room for it if the queue is full.
+        """
+        if self.drop_on_full:
+            self._put_newest(item)
+        else:
+            self.Q.put(item)
+
+    def read(self, timeout: float = None):
+        """Return next frame in the queue.
+
+        Blocks until a frame is available, at most `timeout` seconds
+        before raising `queue.Empty`. Returns None once all frames
+        have been consumed, or raises the error of a transform or
+        of the decoding that ended the frames early.
+        """
+        if self._pending:
+            return self._pending.popleft()
+        item = self._get(timeout)
+        if isinstance(item, list):
+            self._pending.extend(item)
+            return self._pending.popleft()
+        return item
+
+    def read_batch(self, timeout: float = None) -> List[Frame]:
+        """Return the next batch of frames in the queue.
+
+        Same as `read`, but returns a list of up to `batch_size`
+        frames of the same video. Returns None once all frames
+        have been consumed.
+        """
+        if self._pending:
+            batch = list(self._pending)
+            self._pending.clear()
+            return batch
+        item = self._get(timeout)
+        if item is None or isinstance(item, list):
+            return item
+        return [item]
+
+    def _get(self, timeout):
+        """Take the next item out of the queue.
+
+        Raises the error that ended a worker thread in place of
+        the None at the end of the frames.
+        """
+        item = self.Q.get(timeout=timeout)
+        if item is None and self._error is not None:
+            raise self._error
+        return item
+
+    def more(self):
+        """Return True if queue not empty or stream not stopped."""
+        # frames can still be on their way through the transforms
+        return (not self.stopped or self.Q.qsize() > 0 or len(self._pending) > 0
+                or any(thread.is_alive() for thread in self.threads[1:]))
+
+    def open_stream(self, path):
+        """Open a video file, decoding on the GPU if possible."""
+        options = self.capture_options()
+        # the options are read from the environment when a video is opened,
+        # they are only set for this loader while it opens the video
+        with _CAPTURE_OPTIONS_LOCK:
+            os.environ['OPENCV_FFMPEG_CAPTURE_OPTIONS'] = options
+            try:
+                try:
+                    params = [cv2.CAP_PROP_HW_ACCELERATION, self.hw_accel]
+                    if self.hw_device >= 0:
+                        params += [cv2.CAP_PROP_HW_DEVICE, self.hw_device]
+                    if hasattr(cv2, 'CAP_PROP_N_THREADS'):
+                        params += [cv2.CAP_PROP_N_THREADS, self.decoder_threads]
+                    stream = cv2.VideoCapture(path, cv2.CAP_FFMPEG, params)
+                except (AttributeError, TypeError, cv2.error):
+                    # OpenCV builds < 4.5.2 don't support hardware acceleration
+                    stream = None
+                if stream is None or not stream.isOpened():
+                    stream = cv2.VideoCapture(path)
+            finally:
+                if _USER_CAPTURE_OPTIONS is None:
+                    os.environ.pop('OPENCV_FFMPEG_CAPTURE_OPTIONS', None)
+                else:
+                    os.environ['OPENCV_FFMPEG_CAPTURE_OPTIONS'] = _USER_CAPTURE_OPTIONS
+        # frames are consumed as fast as they are decoded,
+        # there is no need to buffer them in the backend
+        stream.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        if self.luma_only:
+            stream.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+        if self.target_size is not None:
+            # only some backends (e.g. cameras) scale the frames,
+            # `read_frame` resizes them otherwise
+            stream.set(cv2.CAP_PROP_FRAME_WIDTH, self.target_size[0])
+            stream.set(cv2.CAP_PROP_FRAME_HEIGHT, self.target_size[1])
+        return stream
+
+    def probe(self):
+        """Read frame shape and fps of the current stream."""
+        if self.target_size is None:
+            self.frame_shape = (int(self.stream.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                                int(self.stream.get(cv2.CAP_PROP_FRAME_WIDTH)))
+        else:
+            self.frame_shape = self.target_size[::-1]
+        self.fps = self.stream.get(cv2.CAP_PROP_FPS)
+
+    def read_frame(self):
+        """Return the next frame in grayscale together with its number."""
+        if not self.stream.grab():
+            return False, None, None
+        # get frame number
+        frame_no = int(self.stream.get(cv2.CAP_PROP_POS_FRAMES))
+        # only decode the frame that is actually kept
+        if self.luma_only and self.target_size is None:
+            _, frame = self.stream.retrieve(self.pool.take(self.frame_shape))
+            if frame.ndim == 2:
+                return True, frame_no, frame
+            # the backend ignored CAP_PROP_CONVERT_RGB
+            self._raw_frame = frame
+        else:
+            # reuse the buffer of the last decoded frame
+            _, self._raw_frame = self.stream.retrieve(self._raw_frame)
+        raw_frame = self._raw_frame
+        if raw_frame.shape[:2] != self.frame_shape:
+            if raw_frame.ndim == 2:
+                # luma, resized into a recycled buffer
+                frame = self.pool.take(self.frame_shape)
+                cv2.resize(raw_frame, self.target_size, dst=frame,
+                           interpolation=cv2.INTER_AREA)
+                return True, frame_no, frame
+            # downscale before the color conversion, which
+            # then has to convert fewer pixels
+            self._small_frame = cv2.resize(raw_frame, self.target_size,
+                                           dst=self._small_frame,
+                                           interpolation=cv2.INTER_AREA)
+            raw_frame = self._small_frame
+        elif raw_frame.ndim == 2:
+            # luma at the target size
+            return True, frame_no, raw_frame.copy()
+        # convert to grayscale into a recycled buffer
+        frame = self.pool.take(raw_frame.shape[:2])
+        cv2.cvtColor(raw_frame, cv2.COLOR_BGR2GRAY, dst=frame)
+        return True, frame_no, frame
+
+    def skip_frames(self, n):
+        if self.seek_strategy == 'seek' or (self.seek_strategy == 'auto'
+                                            and n >= self.SEEK_THRESHOLD):
+            position = self.stream.get(cv2.CAP_PROP_POS_FRAMES)
+            self.stream.set(cv2.CAP_PROP_POS_FRAMES, position + n)
+            return
+        # grab() advances the stream without retrieving the frame,
+        # the following read_frame() reports the end of the file
+        for _ in range(n):
+            if not self.stream.grab():
+                break
+
+    def release_stream(self, stream):
+        """Free the resources of an opened stream."""
+        stream.release()
+
+    def close_stream(self):
+        self.release_stream(self.stream)
+
+    def stop(self):
+        # tell the thread to stop
+        self.stopped = True
+        self._cancelled = True
+        # wait for the stream resources to be released,
+        # emptying the queue unblocks a producer waiting on `put`
+        for thread in self.threads:
+            while thread.is_alive():
+                self._drain()
+                thread.join(timeout=0.1)
+        self._drain()
+        self.opener.join()
+        # release the streams that were opened in advance
+        while True:
+            try:
+                item = self._streams.get_nowait()
+            except Empty:
+                break
+            if item:
+                self.release_stream(item[1])
+        self.pool.clear()
+
+    def _put_newest(self, frame):
+        """Put a frame into the queue, evicting the oldest one if it is full."""
+        while True:
+            try:
+                self.Q.put_nowait(frame)
+                return
+            except Full:
+                try:
+                    self.Q.get_nowait()
+                except Empty:
+                    pass
+
+    def _drain(self):
+        """Discard all frames in the queue."""
+        self._pending.clear()
+        while True:
+            try:
+                self.Q.get_nowait()
+            except Empty:
+                break
+
+
+@dataclass
+class VideoLoaderCUDA(VideoLoader):
+    """VideoLoader that decodes with NVDEC and keeps the frames on the GPU.
+
+    Frames are put into the queue as `cv2.cuda_GpuMat`, so `transforms`
+    have to work on GpuMats as well. Requires OpenCV built with CUDA
+    and the contrib module `cudacodec` (-DWITH_CUDA=ON -DWITH_NVCUVID=ON),
+    which is not part of the pip or conda-forge packages.
+    """
+
+    frame_no: int = field(default=0, init=False)
+
+    def open_stream(self, path):
+        if self.target_size is None:
+            reader = cv2.cudacodec.createVideoReader(path)
+        else:
+            # let the decoder scale the frames
+            params = cv2.cudacodec.VideoReaderInitParams()
+            params.targetSz = self.target_size
+            reader = cv2.cudacodec.createVideoReader(path, params=params)
+        # OpenCV >= 4.7 can output grayscale instead of BGRA,
+        # which saves converting every frame in `read_frame`
+        self._gray_output = hasattr(cv2.cudacodec, 'ColorFormat_GRAY')
+        if self._gray_output:
+            reader.set(cv2.cudacodec.ColorFormat_GRAY)
+        return reader
+
+    def probe(self):
+        info = self.stream.format()
+        if self.target_size is None:
+            self.frame_shape = (info.height, info.width)
+        else:
+            self.frame_shape = self.target_size[::-1]
+        self.fps = info.fps
+
+    def read_frame(self):
+        grabbed, gpu_frame = self.stream.nextFrame()
+        if not grabbed:
+            return False, None, None
+        self.frame_no += 1
+        if self._gray_output:
+            return True, self.frame_no, gpu_frame
+        # older readers return BGRA frames
+        return True, self.frame_no, cv2.cuda.cvtColor(gpu_frame, cv2.COLOR_BGRA2GRAY)
+
+    def skip_frames(self, n):
+        # grab without copying the frames out of the decoder
+        for _ in range(n):
+            if not self.stream.grab():
+                break
+            self.frame_no += 1
+
+    def release_stream(self, stream):
+        # the reader has no release(), dropping it frees the decoder
+        pass
+
+    def close_stream(self):
+        self.stream = None
+        # the next stream starts counting from the beginning
+        self.frame_no = 0
+
+
+@dataclass
+class VideoLoaderFFmpeg(VideoLoader):
+    """VideoLoader that reads grayscale frames from an ffmpeg process.
+
+    Frames are selected, scaled and converted to grayscale by the
+    filters of ffmpeg, the frames that are skipped never reach Python.
+    Requires the ffmpeg executable. `hw_accel`, `fast_decode`,
+    `seek_strategy` and `luma_only` have no effect.
+    """
+
+    def open_stream(self, path):
+        # keep the frames after every `skip_n_frames` skipped
+        # frames, same as grabbing them with VideoCapture
+        step = self.skip_n_frames + 1
+        # threads before the input are the decoding threads
+        stream = ffmpeg.input(path, threads=self.decoder_threads)\
+            .filter('select', f'eq(mod(n,{step}),{step - 1})')
+        if self.target_size is not None:
+            stream = stream.filter('scale', *self.target_size, flags='area')
+        # vsync=0 passes the selected frames on without duplicating them
+        args = (stream
+                .output('pipe:', format='rawvideo', pix_fmt='gray', vsync=0)
+                .global_args('-nostats', '-loglevel', 'error')
+                .compile(cmd='ffmpeg'))
+        # nothing reads stderr, a full pipe would block ffmpeg
+        return subprocess.Popen(args, stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL)
+
+    def probe(self):
+        # the frame shape is needed before the first frame is read
+        info = ffmpeg.probe(self.videos[0].fullpath, select_streams='v:0')['streams'][0]
+        if self.target_size is None:
+            self.frame_shape = (info['height'], info['width'])
+        else:
+            self.frame_shape = self.target_size[::-1]
+        num, den = info['avg_frame_rate'].split('/')
+        self.fps = int(num) / int(den) if int(den) else 0.0
+        self.frame_no = 0
+
+    def read_frame(self):
+        frame = self.pool.take(self.frame_shape)
+        # read the raw frame straight into the recycled buffer
+        n = self.stream.stdout.readinto(memoryview(frame).cast('B'))
+        if n < frame.nbytes:
+            # the output also ends early if ffmpeg fails
+            returncode = self.stream.wait()
+            if returncode:
+                raise subprocess.CalledProcessError(returncode, self.stream.args)
+            return False, None, None
+        self.frame_no += self.skip_n_frames + 1
+        return True, self.frame_no, frame
+
+    def skip_frames(self, n):
+        # frames are skipped by the select filter
+        pass
+
+    def release_stream(self, stream):
+        stream.stdout.close()
+        # stop ffmpeg if the stream is closed before its end
+        stream.kill()
+        stream.wait()
+
+    def close_stream(self):
+        self.release_stream(self.stream)
+        # the next stream starts counting from the beginning
+        self.frame_no = 0
+
+
+@dataclass
+class VideoPlayer:
+    """Play the frames of a VideoLoader.
+
+    Parameters
+    ----------
+    vl : VideoLoader
+    display : bool, default = True
+        show the frames, pass False for batch runs
+        to only apply the transforms and the visitor
+    hud_interval : float, default = 1.0
+        seconds between updates of the queue size and video id overlay
+    """
+
+    vl: VideoLoader
+    display: bool = True
+    hud_interval: float = 1.0
+
+    def play(self,
+             resize: Resize = True,
+             transforms: TransformFactory = None,
+             compare: bool = True,
+             visitor=None):
+        """Play the frames, optionally transformed and analyzed.
+
+        Parameters
+        ----------
+        resize : Resize, default = True
+            applied to the frames before the transforms, True uses
+            `Resize()`. Scaling in the loader with
+            `VideoLoader(target_size=...)` is cheaper, it happens
+            before the grayscale conversion and into recycled buffers
+        transforms : TransformFactory, default = None
+        compare : bool, default = True
+            show the output of every transform next to each other
+        visitor : IVisitor, default = None
+            applied to the transformed frames
+        """
+        if resize is True:
+            resize = Resize()
+
+        self.vl.start()
+
+        # transforms and visitor run in a worker thread, most of their
+        # OpenCV calls release the GIL and overlap with the display
+        self.closed = False
+        # raised again once the display has stopped
+        self._error = None
+        processed = RingBuffer(32)
+        self.worker = Thread(target=self.process,
+                             args=(processed, resize, transforms, visitor))
+        self.worker.daemon = True
+        self.worker.start()
+
+        # text is rendered once into patches that are laid over the frames
+        hud, hud_time = None, None
+        labels = {}
+        self._mosaic = None
+
+        # loop over the processed frames
+        while not self.closed:
+            item = processed.get()
+            if item is None: # all videos are processed
+                break
+            frame, out_frame = item
+
+            if not self.display:
+                continue
+
+            if transforms:
+                if compare:
+                    for i, t in enumerate(transforms.transforms, 1):
+                        name = type(t).__name__
+                        if name not in labels:
+                            labels[name] = self.text_patch(Transform=name)
+                        self.overlay(frame[i], labels[name])
+
+                    out_frame = self.mosaic(frame)
+                else:
+                    out_frame = frame.original
+
+            now = time.monotonic()
+            if hud_time is None or now - hud_time >= self.hud_interval:
+                hud = self.text_patch(QueueSize=self.vl.Q.qsize(),
+                                      VideoID=frame.video_id)
+                hud_time = now
+            self.overlay(out_frame, hud)
+            cv2.imshow("Frame", out_frame)
+
+            self.act_on_key()
+
+        # do a bit of cleanup
+        self.close()
+        if self._error is not None:
+            raise self._error
+
+    def process(self, processed, resize, transforms, visitor):
+        """Apply transforms and visitor to the frames of the VideoLoader.
+
+        The frames are put into `processed` together with the frame to
+        show if there are no transforms, followed by None at the end,
+        also if reading or processing a frame fails.
+        """
+        try:
+            while not self.closed:
+                try:
+                    frame = self.vl.read(timeout=0.1)
+                except Empty:
+                    continue
+                if frame is None: # all videos are processed
+                    break
+                out_frame = frame.last
+
+                if resize:
+                    frame.original = resize.transform(frame.original)
+
+                if transforms:
+                    frame = transforms.transform(frame)
+
+                    if visitor:
+                        visitor.apply(frame)
+
+                self._put_processed(processed, (frame, out_frame))
+        except BaseException as error:
+            self._error = error
+        finally:
+            self._put_processed(processed, None)
+
+    def _put_processed(self, processed, item):
+        """Wait for the display to take the next frame, unless closed."""
+        while not self.closed:
+            try:
+                processed.put(item, timeout=0.1)
+                return
+            except Full:
+                pass
+
+    def close(self):
+        self.closed = True
+        # the worker has to stop reading before the loader is stopped,
+        # there can only be one consumer of the loader's queue
+        self.worker.join()
+        if self.display:
+            cv2.destroyAllWindows()
+        self.vl.stop()
+
+    def put_text(self, frame, **kwargs):
+        x, y = 10, 30
+        for k, v in kwargs.items():
+            cv2.putText(frame, f"{k}: {v}",
+                (x, y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, 255, 2)
+            y += 20
+
+    def text_patch(self, **kwargs) -> np.ndarray:
+        """Return an image with the text of `put_text` on black."""
+        width = max(cv2.getTextSize(f"{k}: {v}", cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)[0][0]
+                    for k, v in kwargs.items())
+        patch = np.zeros((20 * len(kwargs) + 20, width + 20), dtype=np.uint8)
+        self.put_text(patch, **kwargs)
+        return patch
+
+    def overlay(self, frame, patch):
+        """Lay a text patch over the top left corner of a frame."""
+        h, w = min(patch.shape[0], frame.shape[0]), min(patch.shape[1], frame.shape[1])
+        patch = patch[:h, :w]
+        if frame.ndim == 3:
+            patch = patch[..., None]
+        roi = frame[:h, :w]
+        np.maximum(roi, patch, out=roi)
+
+    def mosaic(self, tiles) -> np.ndarray:
+        """Arrange tiles of the same shape in two rows.
+
+        The tiles are copied into an image that is reused for the next
+        mosaic of the same shape. With an odd number of tiles the last
+        place stays blank.
+        """
+        cols = -(-len(tiles) // 2)
+        h, w = tiles[0].shape[:2]
+        shape = (2 * h, cols * w) + tiles[0].shape[2:]
+        if (self._mosaic is None or self._mosaic.shape != shape
+                or self._mosaic.dtype != tiles[0].dtype):
+            # zeros, the blank place is never written to
+            self._mosaic = np.zeros(shape, dtype=tiles[0].dtype)
+        for i, tile in enumerate(tiles):
+            row, col = divmod(i, cols)
+            self._mosaic[row * h:(row + 1) * h, col * w:(col + 1) * w] = tile
+        return self._mosaic
+
+    def act_on_key(self):
+        paused = False
+        while True:
+            # while paused, block until the next key press instead of
+            # polling, the timeout keeps the window responsive
+            k = cv2.waitKey(100 if paused else 1)
+            if k == 27 or k == ord('q'): # press 'ESC' or 'q' to close
+                self.close()
+                break
+            if k == ord(' '): # pause/unpause with 'space'
+                paused = True if not paused else False
+            if not paused:
+                break
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import time
+import weakref
+
+from collections import deque
+from queue import Empty, Full
+from threading import Event
+from typing import Tuple
+
+import cv2
+import numpy as np
+
+
+class FramePool:
+    """Recycle frame buffers instead of allocating a new array per frame.
+
+    `take` hands out a view on a pooled buffer. The buffer goes back
+    to the pool as soon as that view is garbage collected, so consumers
+    don't need to release frames explicitly. Copy a frame if slices
+    of it have to outlive the frame itself.
+    """
+
+    def __init__(self):
+        # deque.append and deque.pop are thread-safe
+        self._free = deque()
+
+    def __len__(self):
+        return len(self._free)
+
+    def take(self, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """Return an uninitialized array of the given shape and dtype."""
+        try:
+            buffer = self._free.pop()
+        except IndexError:
+            buffer = None
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            if buffer is not None:
+                self.discard(buffer)
+            buffer = self.allocate(shape, dtype)
+        view = buffer[...]
+        finalizer = weakref.finalize(view, self._free.append, buffer)
+        finalizer.atexit = False
+        return view
+
+    def reserve(self, n: int, shape: Tuple[int, ...], dtype=np.uint8):
+        """Allocate `n` buffers in advance."""
+        for _ in range(n):
+            self._free.append(self.allocate(shape, dtype))
+
+    def allocate(self, shape: Tuple[int, ...], dtype) -> np.ndarray:
+        return np.empty(shape, dtype=dtype)
+
+    def discard(self, buffer: np.ndarray):
+        """Called for buffers that are dropped from the pool."""
+        pass
+
+    def clear(self):
+        """Drop all buffers that are currently in the pool."""
+        while True:
+            try:
+                buffer = self._free.pop()
+            except IndexError:
+                break
+            self.discard(buffer)
+
+
+class PinnedFramePool(FramePool):
+    """FramePool of page-locked buffers.
+
+    Page-locked memory can be uploaded to the GPU asynchronously,
+    see `Frame.upload`. Requires OpenCV built with CUDA.
+    """
+
+    def allocate(self, shape: Tuple[int, ...], dtype) -> np.ndarray:
+        buffer = super().allocate(shape, dtype)
+        cv2.cuda.registerPageLocked(buffer)
+        return buffer
+
+    def discard(self, buffer: np.ndarray):
+        cv2.cuda.unregisterPageLocked(buffer)
+
+
+class RingBuffer:
+    """Bounded FIFO for exactly one producer and one consumer thread.
+
+    A drop-in for `queue.Queue` between two threads. Items are passed
+    through a fixed list and two counters, each written by one side
+    only, so the common case of a non-empty and non-full buffer takes
+    no lock. Events are only used to sleep while the buffer is empty
+    or full.
+
+    Parameters
+    ----------
+    maxsize : int
+        max number of items in the buffer
+    """
+
+    def __init__(self, maxsize: int):
+        if maxsize < 1:
+            raise ValueError('maxsize has to be at least 1.')
+        self.maxsize = maxsize
+        self._items = [None] * maxsize
+        # number of items put (written by the producer)
+        # and taken (written by the consumer)
+        self._head = 0
+        self._tail = 0
+        self._not_empty = Event()
+        self._not_full = Event()
+
+    def qsize(self) -> int:
+        return self._head - self._tail
+
+    def empty(self) -> bool:
+        return self._head == self._tail
+
+    def full(self) -> bool:
+        return self._head - self._tail >= self.maxsize
+
+    def put(self, item, block: bool = True, timeout: float = None):
+        """Put an item into the buffer, raises `queue.Full` on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.full():
+            # clear before checking again, a `get` in between sets it
+            self._not_full.clear()
+            if not self.full():
+                break
+            if not block or not self._wait(self._not_full, deadline):
+                raise Full
+        head = self._head
+        self._items[head % self.maxsize] = item
+        # publish the item only after it has been written
+        self._head = head + 1
+        if not self._not_empty.is_set():
+            self._not_empty.set()
+
+    def get(self, block: bool = True, timeout: float = None):
+        """Remove and return an item, raises `queue.Empty` on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.empty():
+            # clear before checking again, a `put` in between sets it
+            self._not_empty.clear()
+            if not self.empty():
+                break
+            if not block or not self._wait(self._not_empty, deadline):
+                raise Empty
+        tail = self._tail
+        index = tail % self.maxsize
+        item = self._items[index]
+        # don't keep a reference, frames go back to their pool when released
+        self._items[index] = None
+        self._tail = tail + 1
+        if not self._not_full.is_set():
+            self._not_full.set()
+        return item
+
+    def put_nowait(self, item):
+        self.put(item, block=False)
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    @staticmethod
+    def _wait(event: Event, deadline: float = None) -> bool:
+        if deadline is None:
+            return event.wait()
+        return event.wait(max(0, deadline - time.monotonic()))
@@ -1,20 +1,32 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy_utils import database_exists, drop_database
-
-from camtrappy.db.schema import Base
-from camtrappy.db.utils import new_project
-from camtrappy.io.parsing import ProjectParser
-
-
-db = "sqlite+pysqlite:///N:\\Mitarbeiter\\Florian\\projects\\CamTrapPy\\dev.db"
-engine = create_engine(db, echo=True, future=True)
-Session = sessionmaker(engine, future=True)
-
-
-def initialize_new_project(p: ProjectParser):
-    if database_exists(engine.url):
-        drop_database(engine.url)
-
-    Base.metadata.create_all(engine)
-    new_project(Session, p)
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy_utils import database_exists, drop_database
+
+from camtrappy.db.schema import Base
+from camtrappy.db.utils import new_project
+from camtrappy.io.parsing import ProjectParser
+
+
+db = "sqlite+pysqlite:///N:\\Mitarbeiter\\Florian\\projects\\CamTrapPy\\dev.db"
+engine = create_engine(db, echo=True, future=True)
+Session = sessionmaker(engine, future=True)
+
+
+@event.listens_for(engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    # sync at the end of a transaction only, not for every journal write,
+    # keep temporary tables and indices in memory and allow a 200 MB cache.
+    # WAL would save more syncs, but doesn't work on network drives
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.execute('PRAGMA cache_size=-200000')
+    cursor.close()
+
+
+def initialize_new_project(p: ProjectParser):
+    if database_exists(engine.url):
+        drop_database(engine.url)
+
+    Base.metadata.create_all(engine)
+    new_project(Session, p)
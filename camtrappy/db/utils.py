@@ -1,27 +1,51 @@
-from camtrappy.db.schema import Project, Location, Video
-from camtrappy.io.parsing import ProjectParser
-
-
-def new_project(Session, p: ProjectParser):
-    with Session.begin() as session:
-        # bulk insert is used, even for single items,
-        # to enforce resolution order
-        session.bulk_insert_mappings(Project,
-                                     [dict(name=p.name,
-                                           projectfolder=p.projectfolder,
-                                           datafolder=p.datafolder)])
-
-        project = session.query(Project).filter(Project.name == p.name).scalar()
-        for name in p.locations:
-            session.bulk_insert_mappings(Location,
-                                         [dict(name=name,
-                                               folder=name,
-                                               project_id=project.id)])
-
-            location_id = (session.query(Location)
-                           .filter(Location.name == name)
-                           .scalar()).id
-            data = p.data(name)
-            for video in data:
-                video['location_id'] = location_id
-            session.bulk_insert_mappings(Video, data)
\ No newline at end of file
+from sqlalchemy import insert, select
+from sqlalchemy.orm import raiseload
+
+from camtrappy.db.schema import Project, Location, Video
+from camtrappy.io.parsing import ProjectParser
+
+
+# rows per executemany when inserting videos
+BATCH_SIZE = 5000
+
+
+def new_project(Session, p: ProjectParser):
+    with Session.begin() as session:
+        # the statements are executed right away, in this order, and
+        # the new primary key of the project is read from the cursor
+        project_id = session.execute(
+            insert(Project).values(name=p.name,
+                                   projectfolder=p.projectfolder,
+                                   datafolder=p.datafolder)
+        ).inserted_primary_key[0]
+
+        # one executemany for all locations, a single select for their ids
+        locations = p.locations
+        if locations:
+            session.execute(insert(Location),
+                            [dict(name=name, folder=name, project_id=project_id)
+                             for name in locations])
+        location_ids = dict(session.execute(
+            select(Location.name, Location.id)
+            .where(Location.project_id == project_id)
+        ).all())
+
+        videos = []
+        for name in locations:
+            data = p.data(name)
+            for video in data:
+                video['location_id'] = location_ids[name]
+            videos.extend(data)
+        # all videos of the project in one transaction,
+        # in chunks of a bounded number of rows
+        for i in range(0, len(videos), BATCH_SIZE):
+            session.bulk_insert_mappings(Video, videos[i:i + BATCH_SIZE])
+
+
+def strict_query(cls):
+    """Return a select of `cls` that doesn't lazy load relationships.
+
+    Accessing a relationship that wasn't loaded explicitly, e.g. with
+    `selectinload`, raises instead of silently querying once per row.
+    """
+    return select(cls).options(raiseload('*'))
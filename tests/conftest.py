@@ -0,0 +1,52 @@
+import datetime
+
+import cv2
+import numpy as np
+import pytest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from camtrappy.db.schema import Base, Location, Project, Video
+
+
+# small videos of a single location, written once per test session
+N_VIDEOS = 3
+N_FRAMES = 40
+FRAME_SIZE = (160, 120)
+
+
+@pytest.fixture(scope='session')
+def datafolder(tmp_path_factory):
+    """Folder with the videos of one location in `loc1`."""
+    folder = tmp_path_factory.mktemp('data')
+    (folder / 'loc1').mkdir()
+    for v in range(N_VIDEOS):
+        path = folder / 'loc1' / f'20210101_1{v}0000.avi'
+        writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'),
+                                 25, FRAME_SIZE)
+        for i in range(N_FRAMES):
+            frame = np.full(FRAME_SIZE[::-1] + (3,), 5 * i, dtype=np.uint8)
+            writer.write(frame)
+        writer.release()
+    return folder
+
+
+@pytest.fixture
+def Session(datafolder, tmp_path):
+    """Session of a database with the videos in `datafolder`."""
+    engine = create_engine(f'sqlite:///{tmp_path / "test.db"}', future=True,
+                           connect_args={'check_same_thread': False})
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(engine, future=True)
+    with Session.begin() as session:
+        project = Project(name='test', datafolder=str(datafolder))
+        location = Location(name='loc1', folder='loc1', project=project)
+        session.add(location)
+        session.add_all(Video(path=f'20210101_1{v}0000.avi',
+                              date=datetime.date(2021, 1, 1),
+                              time=datetime.time(10 + v),
+                              location=location)
+                        for v in range(N_VIDEOS))
+    yield Session
+    engine.dispose()
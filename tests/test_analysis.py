@@ -0,0 +1,67 @@
+import cv2
+import numpy as np
+
+from camtrappy.core.analysis import detect_bboxes, merge_bboxes
+
+
+def merged(bboxes, eps=0):
+    return sorted(map(tuple, merge_bboxes(bboxes, eps=eps).tolist()))
+
+
+def test_merge_nothing():
+    assert merge_bboxes([]).shape == (0, 4)
+    assert merged([(1, 2, 3, 4)]) == [(1, 2, 3, 4)]
+
+
+def test_merge_nested():
+    assert merged([(0, 0, 20, 20), (5, 5, 5, 5)]) == [(0, 0, 20, 20)]
+
+
+def test_merge_chained():
+    # the first and the last bbox only overlap through the middle one
+    bboxes = [(0, 0, 10, 10), (8, 0, 10, 10), (16, 5, 10, 10)]
+    assert merged(bboxes) == [(0, 0, 26, 15)]
+    # same chain, given in another order
+    assert merged(bboxes[::-1]) == [(0, 0, 26, 15)]
+
+
+def test_merge_disjoint():
+    bboxes = [(0, 0, 10, 10), (50, 50, 10, 10), (8, 8, 4, 4)]
+    assert merged(bboxes) == [(0, 0, 12, 12), (50, 50, 10, 10)]
+
+
+def test_merge_touching():
+    # bboxes that only share an edge don't overlap
+    assert merged([(0, 0, 10, 10), (10, 0, 10, 10)]) == [(0, 0, 10, 10), (10, 0, 10, 10)]
+
+
+def test_merge_eps():
+    # each bbox grows by eps / 4 of its size on every side
+    bboxes = [(0, 0, 10, 10), (14, 0, 10, 10)]
+    assert len(merged(bboxes, eps=0)) == 2
+    assert len(merged(bboxes, eps=1)) == 1
+    assert merged(bboxes, eps=1) == [(0, 0, 24, 10)]
+
+
+def test_merge_dtype():
+    result = merge_bboxes(np.array([[0, 0, 10, 10], [5, 5, 10, 10]]))
+    assert result.dtype == np.int32
+
+
+def test_detect_bboxes():
+    mask = np.zeros((100, 100), dtype=np.uint8)
+    # a ring with a blob inside, only the outer contour is kept
+    cv2.rectangle(mask, (10, 10), (49, 49), 255, 1)
+    cv2.rectangle(mask, (25, 25), (29, 29), 255, -1)
+    # a blob of 4 x 4 px
+    mask[80:84, 80:84] = 255
+    assert sorted(map(tuple, detect_bboxes(mask).tolist())) == [
+        (10, 10, 40, 40), (80, 80, 4, 4)]
+    # areas of 16 px or less are dropped
+    assert detect_bboxes(mask, min_area=16).tolist() == [[10, 10, 40, 40]]
+    assert len(detect_bboxes(mask, min_area=15)) == 2
+
+
+def test_detect_bboxes_empty():
+    bboxes = detect_bboxes(np.zeros((10, 10), dtype=np.uint8))
+    assert bboxes.shape == (0, 4)
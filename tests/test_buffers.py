@@ -0,0 +1,108 @@
+import gc
+
+from queue import Empty, Full
+from threading import Thread
+
+import numpy as np
+import pytest
+
+from camtrappy.core.buffers import FramePool, RingBuffer
+
+
+class TestRingBuffer:
+
+    def test_maxsize(self):
+        with pytest.raises(ValueError):
+            RingBuffer(0)
+
+    def test_fifo(self):
+        buffer = RingBuffer(3)
+        # wraps around the end of the list a few times
+        for i in range(10):
+            buffer.put(i)
+            buffer.put(i + 100)
+            assert buffer.qsize() == 2
+            assert buffer.get() == i
+            assert buffer.get() == i + 100
+        assert buffer.empty()
+
+    def test_full(self):
+        buffer = RingBuffer(2)
+        buffer.put(1)
+        buffer.put(2)
+        assert buffer.full()
+        with pytest.raises(Full):
+            buffer.put_nowait(3)
+        with pytest.raises(Full):
+            buffer.put(3, timeout=0.01)
+        assert buffer.get() == 1
+        buffer.put_nowait(3)
+        assert [buffer.get(), buffer.get()] == [2, 3]
+
+    def test_empty(self):
+        buffer = RingBuffer(2)
+        with pytest.raises(Empty):
+            buffer.get_nowait()
+        with pytest.raises(Empty):
+            buffer.get(timeout=0.01)
+
+    def test_releases_items(self):
+        buffer = RingBuffer(2)
+        buffer.put(object())
+        buffer.get()
+        assert buffer._items == [None, None]
+
+    def test_threads(self):
+        buffer = RingBuffer(4)
+        n = 10000
+
+        def produce():
+            for i in range(n):
+                buffer.put(i)
+            buffer.put(None)
+
+        producer = Thread(target=produce)
+        producer.start()
+        items = []
+        while True:
+            item = buffer.get(timeout=5)
+            if item is None:
+                break
+            items.append(item)
+        producer.join()
+        assert items == list(range(n))
+
+
+class TestFramePool:
+
+    def test_take(self):
+        pool = FramePool()
+        frame = pool.take((4, 6))
+        assert frame.shape == (4, 6)
+        assert frame.dtype == np.uint8
+        assert pool.take((2, 3), np.float32).dtype == np.float32
+
+    def test_recycle(self):
+        pool = FramePool()
+        frame = pool.take((4, 6))
+        base = frame.base
+        assert len(pool) == 0
+        del frame
+        gc.collect()
+        assert len(pool) == 1
+        # the same buffer is handed out again
+        assert pool.take((4, 6)).base is base
+
+    def test_other_shape(self):
+        pool = FramePool()
+        pool.reserve(1, (4, 6))
+        frame = pool.take((8, 8))
+        assert frame.shape == (8, 8)
+        assert len(pool) == 0
+
+    def test_reserve_and_clear(self):
+        pool = FramePool()
+        pool.reserve(3, (4, 6))
+        assert len(pool) == 3
+        pool.clear()
+        assert len(pool) == 0
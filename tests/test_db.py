@@ -0,0 +1,66 @@
+import datetime
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from camtrappy.db import utils
+from camtrappy.db.schema import Base, Location, Project, Video
+from camtrappy.db.utils import new_project
+
+
+class Parser:
+    """Stands in for a ProjectParser of already parsed videos."""
+
+    name = 'test'
+    projectfolder = '/projects/test'
+    datafolder = '/data/test'
+
+    def __init__(self, videos):
+        self.videos = videos
+
+    @property
+    def locations(self):
+        return list(self.videos)
+
+    def data(self, location):
+        return [dict(path=f'{hour:02}0000.mkv', date=datetime.date(2021, 1, 1),
+                     time=datetime.time(hour), fps=25.0, duration=60.0)
+                for hour in range(self.videos[location])]
+
+
+def test_new_project(tmp_path, monkeypatch):
+    # several chunks per project
+    monkeypatch.setattr(utils, 'BATCH_SIZE', 2)
+    engine = create_engine(f'sqlite:///{tmp_path / "test.db"}', future=True)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(engine, future=True)
+
+    new_project(Session, Parser({'loc1': 3, 'loc2': 0, 'loc3': 2}))
+
+    with Session() as session:
+        project = session.execute(select(Project)).scalar_one()
+        assert (project.name, project.datafolder) == ('test', '/data/test')
+        locations = session.execute(
+            select(Location.name, Location.folder, Location.project_id)
+            .order_by(Location.name)).all()
+        assert locations == [('loc1', 'loc1', project.id),
+                             ('loc2', 'loc2', project.id),
+                             ('loc3', 'loc3', project.id)]
+        videos = session.execute(
+            select(Location.name, Video.path, Video.time)
+            .join(Video.location).order_by(Location.name, Video.time)).all()
+        assert [(name, path) for name, path, _ in videos] == [
+            ('loc1', '000000.mkv'), ('loc1', '010000.mkv'), ('loc1', '020000.mkv'),
+            ('loc3', '000000.mkv'), ('loc3', '010000.mkv')]
+    engine.dispose()
+
+
+def test_new_project_without_locations(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path / "test.db"}', future=True)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(engine, future=True)
+    new_project(Session, Parser({}))
+    with Session() as session:
+        assert len(session.execute(select(Project)).all()) == 1
+        assert not session.execute(select(Location)).all()
+    engine.dispose()
@@ -0,0 +1,258 @@
+import datetime
+import os
+import shutil
+import subprocess
+import time
+
+from threading import Thread
+
+import cv2
+import pytest
+
+from camtrappy.core import base
+from camtrappy.core.base import VideoLoader, VideoLoaderFFmpeg
+from camtrappy.db.schema import Location, Video
+from camtrappy.core.transforms import ITransform, TransformFactory
+
+from tests.conftest import FRAME_SIZE, N_FRAMES, N_VIDEOS
+
+
+def read_all(vl, timeout=5):
+    frames = []
+    while True:
+        frame = vl.read(timeout=timeout)
+        if frame is None:
+            return frames
+        frames.append(frame)
+
+
+def assert_stopped(vl):
+    assert not any(thread.is_alive() for thread in vl.threads)
+    assert not vl.opener.is_alive()
+
+
+class Failing(ITransform):
+    """Raises after `n` frames."""
+
+    def __init__(self, n):
+        self.n = n
+
+    def transform(self, frame):
+        if self.n == 0:
+            raise RuntimeError('transform failed')
+        self.n -= 1
+        return frame
+
+
+def test_read_all(Session):
+    vl = VideoLoader(Session, 1, skip_n_frames=0, queue_size=8)
+    vl.start()
+    frames = read_all(vl)
+    vl.stop()
+    assert len(frames) == N_VIDEOS * N_FRAMES
+    assert [f.video_id for f in frames[::N_FRAMES]] == list(range(1, N_VIDEOS + 1))
+    assert [f.frame_no for f in frames[:N_FRAMES]] == list(range(1, N_FRAMES + 1))
+    assert frames[0].original.shape == (120, 160)
+    assert_stopped(vl)
+
+
+def test_no_videos(Session):
+    with Session.begin() as session:
+        session.add(Location(name='empty', folder='empty', project_id=1))
+    vl = VideoLoader(Session, 2)
+    with pytest.raises(ValueError):
+        vl.start()
+
+
+def test_skip_frames(Session):
+    vl = VideoLoader(Session, 1, skip_n_frames=9)
+    vl.start()
+    frames = read_all(vl)
+    vl.stop()
+    assert [f.frame_no for f in frames[:N_FRAMES // 10]] == [10, 20, 30, 40]
+
+
+def test_batches(Session):
+    vl = VideoLoader(Session, 1, skip_n_frames=0, batch_size=16)
+    vl.start()
+    batches = []
+    while True:
+        batch = vl.read_batch(timeout=5)
+        if batch is None:
+            break
+        batches.append(batch)
+    vl.stop()
+    assert sum(len(b) for b in batches) == N_VIDEOS * N_FRAMES
+    # frames of different videos are never batched together
+    assert all(len({f.video_id for f in b}) == 1 for b in batches)
+
+
+def test_stop_mid_stream(Session):
+    vl = VideoLoader(Session, 1, skip_n_frames=0, queue_size=2)
+    vl.start()
+    for _ in range(5):
+        assert vl.read(timeout=5) is not None
+    vl.stop()
+    assert_stopped(vl)
+
+
+def test_stop_while_opening(Session, monkeypatch):
+    # the second video takes longer to open than the first one to decode
+    open_stream = VideoLoader.open_stream
+    released = []
+
+    def slow_open_stream(self, path):
+        if not path.endswith('100000.avi'):
+            time.sleep(0.5)
+        return open_stream(self, path)
+
+    def release_stream(self, stream):
+        released.append(stream)
+        stream.release()
+
+    monkeypatch.setattr(VideoLoader, 'open_stream', slow_open_stream)
+    monkeypatch.setattr(VideoLoader, 'release_stream', release_stream)
+    vl = VideoLoader(Session, 1, skip_n_frames=0)
+    vl.start()
+    for _ in range(N_FRAMES):
+        assert vl.read(timeout=5) is not None
+    vl.stop()
+    assert_stopped(vl)
+    # the first video and the one opened after the stop
+    assert len(released) >= 2
+
+
+def test_open_error(Session, monkeypatch):
+    open_stream = VideoLoader.open_stream
+
+    def failing_open_stream(self, path):
+        if path.endswith('120000.avi'):
+            raise OSError('open failed')
+        return open_stream(self, path)
+
+    monkeypatch.setattr(VideoLoader, 'open_stream', failing_open_stream)
+    vl = VideoLoader(Session, 1, skip_n_frames=0)
+    vl.start()
+    n = 0
+    with pytest.raises(OSError):
+        while vl.read(timeout=5) is not None:
+            n += 1
+    vl.stop()
+    # the frames of the videos before are still read
+    assert n == 2 * N_FRAMES
+    assert_stopped(vl)
+
+
+def test_transform_error(Session):
+    transforms = TransformFactory([Failing(10)])
+    vl = VideoLoader(Session, 1, skip_n_frames=0, transforms=transforms)
+    vl.start()
+    n = 0
+    with pytest.raises(RuntimeError):
+        while vl.read(timeout=5) is not None:
+            n += 1
+    assert n == 10
+    vl.stop()
+    assert_stopped(vl)
+
+
+def test_stop_with_transforms(Session):
+    transforms = TransformFactory([Failing(N_VIDEOS * N_FRAMES)])
+    vl = VideoLoader(Session, 1, skip_n_frames=0, queue_size=2,
+                     transforms=transforms)
+    vl.start()
+    for _ in range(5):
+        assert vl.read(timeout=5) is not None
+    vl.stop()
+    assert_stopped(vl)
+
+
+def test_capture_options_restored(Session, monkeypatch):
+    monkeypatch.delenv('OPENCV_FFMPEG_CAPTURE_OPTIONS', raising=False)
+    monkeypatch.setattr(base, '_USER_CAPTURE_OPTIONS', None)
+    vl = VideoLoader(Session, 1, fast_decode=True)
+    vl.start()
+    read_all(vl)
+    vl.stop()
+    assert 'OPENCV_FFMPEG_CAPTURE_OPTIONS' not in os.environ
+
+
+def test_malformed_capture_options(Session, monkeypatch):
+    monkeypatch.setattr(base, '_USER_CAPTURE_OPTIONS', 'probesize;32||threads|')
+    vl = VideoLoader(Session, 1)
+    with pytest.warns(UserWarning, match='threads'):
+        options = vl.capture_options()
+    assert 'probesize;32' in options.split('|')
+    vl.start()
+    assert len(read_all(vl)) == N_VIDEOS * N_FRAMES // 10
+    vl.stop()
+
+
+def test_capture_options_parallel(Session, monkeypatch):
+    # every capture is opened with the options of its own loader
+    monkeypatch.setattr(base, '_USER_CAPTURE_OPTIONS', None)
+    VideoCapture = cv2.VideoCapture
+    seen = []
+
+    def capture(path, *args):
+        options = os.environ.get('OPENCV_FFMPEG_CAPTURE_OPTIONS')
+        time.sleep(0.01)
+        seen.append((options, os.environ.get('OPENCV_FFMPEG_CAPTURE_OPTIONS')))
+        return VideoCapture(path, *args)
+
+    monkeypatch.setattr(cv2, 'VideoCapture', capture)
+    loaders = [VideoLoader(Session, 1, fast_decode=fast_decode)
+               for fast_decode in (False, True)]
+    threads = [Thread(target=vl.open_stream, args=(vl.videos[0].fullpath,))
+               for vl in loaders for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(seen) == 20
+    assert all(before == after for before, after in seen)
+
+
+def test_hw_device_requires_hw_accel(Session):
+    with pytest.raises(ValueError):
+        VideoLoader(Session, 1, hw_device=0)
+
+
+@pytest.fixture
+def ffmpeg_loader(monkeypatch):
+    if shutil.which('ffmpeg') is None:
+        pytest.skip('ffmpeg is not installed')
+
+    # ffprobe isn't needed for the known test videos
+    def probe(self):
+        self.frame_shape = FRAME_SIZE[::-1]
+        self.fps = 25.0
+        self.frame_no = 0
+
+    monkeypatch.setattr(VideoLoaderFFmpeg, 'probe', probe)
+    return VideoLoaderFFmpeg
+
+
+def test_ffmpeg_read_all(Session, ffmpeg_loader):
+    vl = ffmpeg_loader(Session, 1, skip_n_frames=9)
+    vl.start()
+    frames = read_all(vl)
+    vl.stop()
+    assert len(frames) == N_VIDEOS * N_FRAMES // 10
+    assert [f.frame_no for f in frames[:N_FRAMES // 10]] == [10, 20, 30, 40]
+
+
+def test_ffmpeg_error(Session, ffmpeg_loader):
+    with Session.begin() as session:
+        session.add(Video(path='missing.avi', date=datetime.date(2021, 1, 1),
+                          time=datetime.time(23), location_id=1))
+    vl = ffmpeg_loader(Session, 1, skip_n_frames=9)
+    vl.start()
+    n = 0
+    # a failing ffmpeg is not taken for the end of the video
+    with pytest.raises(subprocess.CalledProcessError):
+        while vl.read(timeout=5) is not None:
+            n += 1
+    vl.stop()
+    assert n == N_VIDEOS * N_FRAMES // 10
+    assert_stopped(vl)
@@ -0,0 +1,73 @@
+import datetime
+import os
+
+import pytest
+
+from camtrappy.io import parsing
+from camtrappy.io.parsing import (datetime_from_filenames, fps_and_durations_from_files,
+                                  parse_videos)
+
+
+@pytest.fixture
+def probe(monkeypatch):
+    """Replace ffprobe by the frame rates given per file name."""
+    rates = {}
+
+    def fake_probe(video, **kwargs):
+        avg, r = rates[video]
+        return {'streams': [{'avg_frame_rate': avg, 'r_frame_rate': r}],
+                'format': {'duration': '60.5'}}
+
+    monkeypatch.setattr(parsing.ffmpeg, 'probe', fake_probe)
+    return rates
+
+
+def test_fps_and_durations(probe):
+    probe.update({'a.mkv': ('25/1', '25/1'),
+                  'b.mkv': ('30000/1001', '30000/1001'),
+                  'c.mkv': ('0/0', '15/1'),
+                  'd.mkv': ('0/0', '0/0')})
+    fps, durations = fps_and_durations_from_files(['a.mkv', 'b.mkv', 'c.mkv', 'd.mkv'])
+    assert fps == [25.0, pytest.approx(29.97, abs=0.01), 15.0, 0.0]
+    assert durations == [60.5] * 4
+
+
+def test_datetime_from_filenames():
+    paths = [os.path.join('loc1', 'sub', '20210315_134501_1.mkv'),
+             '20210316_014501.mkv']
+    dates, times = datetime_from_filenames(paths)
+    assert dates == [datetime.date(2021, 3, 15), datetime.date(2021, 3, 16)]
+    assert times == [datetime.time(13, 45, 1), datetime.time(1, 45, 1)]
+
+
+def test_datetime_from_filenames_yy():
+    dates, times = datetime_from_filenames(['210315_134501.mkv'], slice=(0, 13))
+    assert dates == [datetime.date(2021, 3, 15)]
+    assert times == [datetime.time(13, 45, 1)]
+
+
+def test_datetime_from_filenames_12h():
+    _, times = datetime_from_filenames(['20210315_014501.mkv'], clock_24h=False)
+    assert times == [datetime.time(1, 45, 1)]
+
+
+def test_datetime_from_folders():
+    # date and time taken from a folder instead of the file name
+    path = os.path.join('20210315_134501', 'video.mkv')
+    dates, times = datetime_from_filenames([path], part=0)
+    assert dates == [datetime.date(2021, 3, 15)]
+    assert times == [datetime.time(13, 45, 1)]
+
+
+def test_parse_videos(tmp_path):
+    for name in ['a.mkv', 'b.avi', os.path.join('sub', 'c.mkv'),
+                 os.path.join('sub', 'deeper', 'd.mkv'), 'e.mkv.txt']:
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+    # folders that are symlinks aren't followed
+    os.symlink(tmp_path / 'sub', tmp_path / 'link', target_is_directory=True)
+    videos = parse_videos(tmp_path, 'mkv')
+    assert sorted(videos) == sorted(['a.mkv', os.path.join('sub', 'c.mkv'),
+                                     os.path.join('sub', 'deeper', 'd.mkv')])
+    assert parse_videos(str(tmp_path), 'avi') == ['b.avi']
@@ -0,0 +1,62 @@
+import pytest
+
+from camtrappy.core.analysis import IVisitor
+from camtrappy.core.base import VideoLoader, VideoPlayer
+from camtrappy.core.transforms import ITransform, TransformFactory
+
+from tests.conftest import N_FRAMES, N_VIDEOS
+
+
+class Identity(ITransform):
+
+    def transform(self, frame):
+        return frame
+
+
+class Counter(IVisitor):
+    """Counts the frames, raises after `fail_after` frames."""
+
+    def __init__(self, fail_after=None):
+        super().__init__()
+        self.n = 0
+        self.fail_after = fail_after
+
+    def apply(self, frame):
+        if self.n == self.fail_after:
+            raise RuntimeError('visitor failed')
+        self.n += 1
+
+
+def play(Session, visitor, **kwargs):
+    vl = VideoLoader(Session, 1, skip_n_frames=0, **kwargs)
+    player = VideoPlayer(vl, display=False)
+    player.play(resize=False, transforms=TransformFactory([Identity()]),
+                visitor=visitor)
+    return player
+
+
+def test_play(Session):
+    visitor = Counter()
+    player = play(Session, visitor)
+    assert visitor.n == N_VIDEOS * N_FRAMES
+    assert not player.worker.is_alive()
+
+
+def test_visitor_error(Session):
+    with pytest.raises(RuntimeError, match='visitor'):
+        play(Session, Counter(fail_after=5), queue_size=2)
+
+
+def test_loader_error(Session, monkeypatch):
+    open_stream = VideoLoader.open_stream
+
+    def failing_open_stream(self, path):
+        if path.endswith('110000.avi'):
+            raise OSError('open failed')
+        return open_stream(self, path)
+
+    vl = VideoLoader(Session, 1, skip_n_frames=0)
+    monkeypatch.setattr(VideoLoader, 'open_stream', failing_open_stream)
+    player = VideoPlayer(vl, display=False)
+    with pytest.raises(OSError):
+        player.play(resize=False)
@@ -0,0 +1,34 @@
+import datetime
+
+import os
+
+from camtrappy.core.base import FULLPATH, VideoList, get_videos
+from camtrappy.db.schema import Location, Video
+
+
+def video(day, hour):
+    return Video(date=datetime.date(2021, 1, day), time=datetime.time(hour))
+
+
+def test_sort_key():
+    # a later day with an earlier time comes after the day before
+    videos = [video(2, 9), video(1, 10), video(1, 8)]
+    ordered = sorted(videos, key=Video.sort_key)
+    assert [(v.date.day, v.time.hour) for v in ordered] == [(1, 8), (1, 10), (2, 9)]
+
+
+def test_chronological(Session):
+    videos = VideoList(Session, 1)
+    videos.videos.reverse()
+    assert [v.id for v in videos.chronological()] == [1, 2, 3]
+
+
+def test_fullpath(Session, datafolder):
+    with Session.begin() as session:
+        # a second location must not multiply the rows
+        session.add(Location(name='loc2', folder='loc2', project_id=1))
+    expected = [os.path.join(str(datafolder), 'loc1', f'20210101_1{v}0000.avi')
+                for v in range(3)]
+    rows = get_videos(Session, 1, Video.id, FULLPATH)
+    assert [row.fullpath for row in rows] == expected
+    assert [video.fullpath for video in get_videos(Session, 1)] == expected
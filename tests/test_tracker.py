@@ -0,0 +1,108 @@
+import numpy as np
+
+from sqlalchemy import select
+
+from camtrappy.core.analysis import CentroidTracker
+from camtrappy.core.base import Frame
+from camtrappy.db.schema import Object as DbObject, VideoObject
+
+
+def bboxes(*corners, size=10):
+    return np.array([(x, y, size, size) for x, y in corners], dtype=np.int32)
+
+
+def mask(*corners, size=10):
+    mask = np.zeros((120, 160), dtype=np.uint8)
+    for x, y in corners:
+        mask[y:y + size, x:x + size] = 255
+    return mask
+
+
+def test_ids_persist():
+    tracker = CentroidTracker()
+    for i in range(5):
+        # two objects moving to the right
+        tracker.update(1, i, bboxes((10 + 5 * i, 10), (100 + 5 * i, 50)))
+    assert list(tracker.current_objects) == [0, 1]
+    assert tracker.current_objects[0].frames(1).tolist() == [0, 1, 2, 3, 4]
+    assert tracker.current_objects[1].centroids(1)[-1].tolist() == [125, 55]
+
+
+def test_optimal_assignment():
+    tracker = CentroidTracker()
+    tracker.update(1, 0, bboxes((0, 0), (10, 0)))
+    # matched greedily, the second object would take the closest centroid
+    # and leave the first one with a jump of 19 px. The assignment
+    # moves both by 9 px, the smaller sum of squared distances
+    tracker.update(1, 1, bboxes((9, 0), (19, 0)))
+    assert tracker.current_objects[0].centroids(1)[-1].tolist() == [14, 5]
+    assert tracker.current_objects[1].centroids(1)[-1].tolist() == [24, 5]
+
+
+def test_max_distance():
+    tracker = CentroidTracker(max_distance=50)
+    tracker.update(1, 0, bboxes((10, 10)))
+    tracker.update(1, 1, bboxes((30, 10)))
+    # too far away to be the same object
+    tracker.update(1, 2, bboxes((130, 10)))
+    assert list(tracker.current_objects) == [0, 1]
+    assert tracker.disappeared_objects == {0: 1, 1: 0}
+    assert tracker.current_objects[0].frames(1).tolist() == [0, 1]
+
+
+def test_without_max_distance():
+    tracker = CentroidTracker()
+    tracker.update(1, 0, bboxes((10, 10)))
+    tracker.update(1, 1, bboxes((130, 10)))
+    assert list(tracker.current_objects) == [0]
+
+
+def test_deregister():
+    tracker = CentroidTracker(maxDisappeared=2)
+    tracker.update(1, 0, bboxes((10, 10), (100, 10)))
+    for i in range(1, 3):
+        tracker.update(1, i, bboxes((100, 10)))
+    # missing for maxDisappeared frames, still tracked
+    assert tracker.disappeared_objects == {0: 2, 1: 0}
+    tracker.update(1, 3, bboxes((100, 10)))
+    assert list(tracker.current_objects) == [1]
+    assert list(tracker.finished_objects) == [0]
+    # the remaining object keeps its id after the swap-remove
+    tracker.update(1, 4, bboxes((105, 10)))
+    assert tracker.current_objects[1].frames(1).tolist() == [0, 1, 2, 3, 4]
+    for i in range(5, 8):
+        tracker.update(1, i, bboxes())
+    assert not tracker.current_objects
+    assert list(tracker.finished_objects) == [0, 1]
+
+
+def test_many_objects():
+    # more objects than the initial capacity of the arrays
+    tracker = CentroidTracker()
+    corners = [(x, y) for x in range(0, 2000, 20) for y in range(0, 200, 20)]
+    for i in range(3):
+        tracker.update(1, i, bboxes(*corners))
+    assert len(tracker.current_objects) == len(corners)
+    assert all(len(o.frames(1)) == 3 for o in tracker.current_objects.values())
+
+
+def test_video_objects(Session):
+    tracker = CentroidTracker(maxDisappeared=1, eps=0, Session=Session)
+    frames = [(1, 1, (10, 10)), (1, 2, (14, 10)), (2, 1, (18, 10)),
+              (2, 2, None), (2, 3, None)]
+    for video_id, frame_no, corner in frames:
+        corners = [corner] if corner else []
+        frame = Frame(video_id, frame_no, [mask(*corners), mask(*corners)])
+        tracker.apply(frame)
+    assert not tracker.finished_objects
+
+    with Session() as session:
+        assert len(session.execute(select(DbObject)).all()) == 1
+        rows = session.execute(
+            select(VideoObject).order_by(VideoObject.video_id)).scalars().all()
+        assert [row.video_id for row in rows] == [1, 2]
+        assert rows[0].frames == [1, 2]
+        assert rows[0].bboxes == [[10, 10, 10, 10], [14, 10, 10, 10]]
+        assert rows[0].centroids == [[15, 15], [19, 15]]
+        assert rows[1].frames == [1]
+        assert rows[1].object_id == rows[0].object_id
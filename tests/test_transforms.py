@@ -0,0 +1,51 @@
+import cv2
+import numpy as np
+import pytest
+
+from camtrappy.core.transforms import Hysteresis, Threshold
+
+
+@pytest.fixture
+def frame():
+    """Blurred shapes of different contrast on a noisy background."""
+    rng = np.random.default_rng(0)
+    frame = np.zeros((120, 160), dtype=np.uint8)
+    cv2.circle(frame, (40, 60), 20, 200, -1)
+    cv2.rectangle(frame, (90, 30), (130, 90), 60, -1)
+    # only weak edges, dropped by the hysteresis
+    cv2.rectangle(frame, (140, 5), (150, 15), 25, -1)
+    frame = cv2.GaussianBlur(frame, (5, 5), 0)
+    return (frame + rng.integers(0, 8, frame.shape)).astype(np.uint8)
+
+
+def test_hysteresis(frame):
+    result = Hysteresis().transform(frame)
+    assert result.dtype == np.uint8
+    assert set(np.unique(result)) == {0, 255}
+    assert not result[:25, 135:].any()
+
+
+def test_hysteresis_like_skimage(frame):
+    filters = pytest.importorskip('skimage.filters')
+    hysteresis = Hysteresis()
+    expected = filters.apply_hysteresis_threshold(filters.sobel(frame),
+                                                  hysteresis.low, hysteresis.high)
+    np.testing.assert_array_equal(hysteresis.transform(frame) > 0, expected)
+
+
+@pytest.mark.parametrize('type, expected', [
+    ('binary', [0, 0, 255, 255]),
+    ('binary_inv', [255, 255, 0, 0]),
+    ('trunc', [0, 100, 100, 100]),
+    ('tozero', [0, 0, 101, 200]),
+    ('tozero_inv', [0, 100, 0, 0]),
+])
+def test_threshold(type, expected):
+    frame = np.array([[0, 100, 101, 200]], dtype=np.uint8)
+    result = Threshold(min=100, type=type).transform(frame)
+    assert result.tolist() == [expected]
+
+
+def test_threshold_type():
+    with pytest.raises(ValueError):
+        Threshold(type='otsu')